@@ -0,0 +1,118 @@
+"""
+Content negotiation and encoders for compressed API responses.
+
+``gzip`` is always available; ``br`` needs the ``brotli`` package and
+``zstd`` the ``zstandard`` package. ``negotiate`` picks the client's most
+preferred coding (``Accept-Encoding`` q-values), breaking ties by
+``PREFERENCE``. Compressed bodies of responses with a strong ``ETag`` are
+cached under that ETag, so a hot event list is compressed once per change
+rather than on every request.
+"""
+import gzip
+import hashlib
+
+from django.core.cache import cache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+# Server-side order among codings the client rates equally
+PREFERENCE = ('br', 'zstd', 'gzip')
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'application/xml', 'image/svg+xml', 'text/csv',
+}
+
+
+def compress_gzip(data, level):
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_brotli(data, level):
+    return brotli.compress(data, quality=level, mode=brotli.MODE_TEXT)
+
+
+def compress_zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def available_codings():
+    """``{coding: compress(data, level)}`` for the codecs installed here"""
+    codings = {'gzip': compress_gzip}
+    if brotli is not None:
+        codings['br'] = compress_brotli
+    if zstandard is not None:
+        codings['zstd'] = compress_zstd
+    return codings
+
+
+def parse_accept_encoding(header):
+    """``{coding: q}`` from an ``Accept-Encoding`` header"""
+    ratings = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ratings[coding] = q
+    return ratings
+
+
+def negotiate(header, codings):
+    """The coding from ``codings`` to send for ``header``, or None for identity"""
+    if not header:
+        return None
+    ratings = parse_accept_encoding(header)
+    wildcard = ratings.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in PREFERENCE:
+        if coding not in codings:
+            continue
+        q = ratings.get(coding, ratings.get('x-gzip', wildcard) if coding == 'gzip' else wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(';')[0].strip().lower()
+    return (
+        media_type.startswith('text/')
+        or media_type.endswith('+json')
+        or media_type in COMPRESSIBLE_TYPES
+    )
+
+
+def cache_key(coding, level, etag, content):
+    # The length guards against a view reusing an ETag for different bytes
+    digest = hashlib.md5(etag.encode(), usedforsecurity=False).hexdigest()
+    return f'compression:{coding}:{level}:{digest}:{len(content)}'
+
+
+def compressed(content, coding, level, compress, etag=None, timeout=None):
+    """``content`` compressed with ``coding``, through the cache when ``etag`` is given"""
+    if etag is None:
+        return compress(content, level)
+    key = cache_key(coding, level, etag, content)
+    body = cache.get(key)
+    if body is None:
+        body = compress(content, level)
+        cache.set(key, body, timeout)
+    return body
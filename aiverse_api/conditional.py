@@ -0,0 +1,40 @@
+"""
+Conditional GET support for read-mostly endpoints.
+
+Views compute cheap validators for the data behind a response (typically one
+aggregate query), and ``conditional_response`` answers ``If-None-Match`` /
+``If-Modified-Since`` with a 304 before anything is serialized.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(request, *parts):
+    """Strong ETag over the request URL, the negotiated media type and the validator parts"""
+    accepted = getattr(request, 'accepted_media_type', '') or ''
+    source = '|'.join(str(part) for part in (request.build_absolute_uri(), accepted, *parts))
+    return quote_etag(hashlib.md5(source.encode(), usedforsecurity=False).hexdigest())
+
+
+def conditional_response(request, etag, last_modified, build, cache_control=None):
+    """Return a 304 if the client's copy is current, otherwise ``build()`` with validators.
+
+    ``last_modified`` is an aware datetime or None. ``cache_control`` defaults
+    to ``settings.PUBLIC_CACHE_CONTROL``.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = build()
+        if not 200 <= response.status_code < 300:
+            return response
+
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, **(cache_control or settings.PUBLIC_CACHE_CONTROL))
+    patch_vary_headers(response, ['Accept'])
+    return response
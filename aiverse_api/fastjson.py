@@ -0,0 +1,106 @@
+"""
+JSON renderer/parser backed by ``orjson`` when it is installed.
+
+``FastJSONRenderer`` produces the same bytes as DRF's ``JSONRenderer`` with
+the default (compact, ``UNICODE_JSON``, ``STRICT_JSON``) settings: datetimes
+and times are left to orjson (``+00:00`` written as ``Z``, as DRF does),
+``Decimal`` and any other non-native type go through DRF's own
+``JSONEncoder.default``, and U+2028/U+2029 are escaped. Where orjson would
+write something differently it hands the payload back to the stdlib encoder:
+
+- Decimals whose float needs an exponent (orjson ``1e16``, stdlib ``1e+16``);
+- anything orjson refuses, such as integers beyond 64 bits or non-string keys;
+- indented output (the browsable API, ``; indent=`` in ``Accept``).
+
+``FastJSONParser`` likewise leaves non-UTF-8 bodies, bodies with integers too
+long for orjson and invalid JSON (for the error message) to ``json.loads``.
+
+Plain ``float`` values are written by orjson itself, so two differences are
+left: exponents are spelled ``1e16``/``1e-5`` (the same number), and
+NaN/infinity become ``null`` instead of raising. Without orjson both classes
+behave exactly like DRF's.
+"""
+from decimal import Decimal
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders, json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+# repr() switches to exponent notation outside this range, spelled unlike orjson's
+PLAIN_FLOAT_RANGE = (1e-4, 1e16)
+# orjson reads integers past 64 bits as floats; bodies with a run of 19 digits
+# go to the stdlib. Digits map to b'0' and everything else to b' ' to find runs.
+DIGITS_ONLY = bytes(ord('0') if chr(byte).isdigit() else ord(' ') for byte in range(256))
+LONG_DIGIT_RUN = b'0' * 19
+
+
+class NeedsStdlib(Exception):
+    """Raised from ``default`` for values orjson would write differently"""
+
+
+def encoder_name():
+    """The encoder in use, for logs and benchmarks"""
+    return f'orjson {orjson.__version__}' if orjson else 'json (stdlib)'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` encoding with orjson, byte-for-byte compatible with the stdlib path"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encode_default = encoders.JSONEncoder().default
+
+    def default(self, obj):
+        value = self.encode_default(obj)
+        if isinstance(obj, Decimal) and value and not PLAIN_FLOAT_RANGE[0] <= abs(value) < PLAIN_FLOAT_RANGE[1]:
+            raise NeedsStdlib(obj)
+        return value
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type or '', renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError:
+            # Also raised for NeedsStdlib from default()
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer: these are valid JSON but not valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """``JSONParser`` decoding UTF-8 bodies with orjson"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if orjson is None or not self.strict or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if LONG_DIGIT_RUN not in body.translate(DIGITS_ONLY):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        # Rejected (or, like huge integers, unsupported): let the stdlib decide,
+        # so error messages match JSONParser's
+        try:
+            return json.loads(body.decode(encoding), parse_constant=json.strict_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,137 @@
+"""
+Sparse fieldsets: ``?fields=``, ``?omit=`` and ``?expand=`` on read endpoints.
+
+``SparseFieldsetSerializerMixin`` trims a top-level serializer to the
+requested fields (``fields`` keeps only those, ``omit`` drops some) and swaps
+relations listed in ``Meta.expandable_fields`` for nested objects when named in
+``expand``. ``SparseFieldsetViewMixin`` then narrows the queryset on GET to
+what those fields read: ``only()`` the columns, ``select_related`` the
+followed foreign keys and ``prefetch_related`` only the nested lists that are
+still serialized.
+
+Each serializer field must say which model fields it reads: model fields and
+dotted ``source`` paths are worked out from the field, others take a
+``model_dependencies`` attribute or an entry in ``Meta.field_dependencies``.
+With any field left unknown the queryset is not narrowed.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def param_set(params, name):
+    return {value.strip() for value in params.get(name, '').split(',') if value.strip()}
+
+
+class SparseFieldsetSerializerMixin:
+    """Honour ``?fields=``/``?omit=``/``?expand=`` from the request in the serializer context.
+
+    Only on safe requests: a write trimmed to ``?fields=id`` would silently
+    drop the data it was sent. Unknown names are a 400.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        params = request.query_params
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        expand = param_set(params, 'expand')
+        only = param_set(params, 'fields')
+        omit = param_set(params, 'omit')
+        for name, requested, known in (
+            ('expand', expand, set(expandable)),
+            ('fields', only, set(self.fields)),
+            ('omit', omit, set(self.fields)),
+        ):
+            unknown = requested - known
+            if unknown:
+                raise ParseError(f'Unknown field(s) in ?{name}=: {", ".join(sorted(unknown))}')
+
+        for name in expand:
+            serializer_class, options = expandable[name]
+            self.fields[name] = serializer_class(read_only=True, **options)
+
+        for name in list(self.fields):
+            if (only and name not in only) or name in omit:
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """Narrow the queryset of safe requests to the fields the serializer will read"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in SAFE_METHODS:
+            ordering = getattr(self.paginator, 'ordering', ()) if self.paginator else ()
+            queryset = self.sparse_queryset(queryset, ordering)
+        return queryset
+
+    def sparse_queryset(self, queryset, ordering=()):
+        """``queryset`` loading only what the (trimmed) serializer reads, plus ``ordering``'s fields"""
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        required = [name.lstrip('-') for name in ordering]
+        return narrow(queryset, self.get_serializer(), required)
+
+
+def field_dependencies(name, field, serializer):
+    """Model paths (``'user__email'``) that serializer field ``name`` reads, or None if unknown"""
+    declared = getattr(serializer.Meta, 'field_dependencies', {})
+    if name in declared:
+        return list(declared[name])
+    if getattr(field, 'model_dependencies', None) is not None:
+        return list(field.model_dependencies)
+    if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+        return None
+    path = field.source.replace('.', '__')
+    if isinstance(field, serializers.ListSerializer):
+        return [path]
+    if isinstance(field, serializers.BaseSerializer):
+        nested = []
+        for child_name, child in field.fields.items():
+            child_paths = field_dependencies(child_name, child, field)
+            if child_paths is None:
+                return None
+            nested.extend(f'{path}__{child_path}' for child_path in child_paths)
+        return nested or [path]
+    return [path]
+
+
+def narrow(queryset, serializer, required=()):
+    """Apply ``only``/``select_related``/``prefetch_related`` for ``serializer.fields``"""
+    model = queryset.model
+    columns = {model._meta.pk.name, *required}
+    select = set()
+    prefetch = set()
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        paths = field_dependencies(name, field, serializer)
+        if paths is None:
+            return queryset
+        for path in paths:
+            first, _, rest = path.partition('__')
+            try:
+                model_field = model._meta.get_field(first)
+            except FieldDoesNotExist:
+                # A property or annotation we know nothing about
+                return queryset
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch.add(first)
+            elif model_field.is_relation and rest:
+                select.add(first)
+                columns.update((first, path))
+            else:
+                columns.add(first)
+
+    queryset = queryset.select_related(None).prefetch_related(None).only(*columns)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
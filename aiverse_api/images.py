@@ -0,0 +1,261 @@
+"""
+Responsive derivatives for uploaded images.
+
+``register(Model, 'field')`` tracks an ImageField: when a new file is saved,
+a job is queued (after the transaction commits) on a small thread pool that
+renders WebP and JPEG copies at ``settings.IMAGE_VARIANTS['WIDTHS']`` with
+the EXIF orientation applied. The storage names are recorded in the model's
+``<field>_variants`` JSONField as ``{format: {width: name}}``; until the job
+finishes that map is empty and ``SrcsetField`` falls back to the original.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import Signal
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Sent with ``sender=model, pk=..., field=...`` once a row's variants are stored
+variants_ready = Signal()
+
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def variant_name(name, width, fmt):
+    """``event_gallery/photo.jpg`` -> ``event_gallery/variants/photo__w640.webp``"""
+    path = PurePosixPath(name)
+    return str(path.parent / 'variants' / f'{path.stem}__w{width}.{FORMATS[fmt][1]}')
+
+
+def render_variants(storage, name):
+    """Write every configured variant of ``name`` and return ``{format: {width: name}}``"""
+    from PIL import Image, ImageOps
+
+    options = settings.IMAGE_VARIANTS
+    with storage.open(name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    # Never upscale; an image narrower than every width gets one copy at its own size
+    widths = sorted({min(width, image.width) for width in options['WIDTHS']})
+    variants = {}
+    for fmt in options['FORMATS']:
+        pil_format = FORMATS[fmt][0]
+        variants[fmt] = {}
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+            if pil_format == 'JPEG' and resized.mode != 'RGB':
+                resized = flatten(resized)
+            elif resized.mode not in ('RGB', 'RGBA'):
+                resized = resized.convert('RGBA')
+
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, quality=options['QUALITY'], optimize=True)
+            variants[fmt][str(width)] = storage.save(variant_name(name, width, fmt), ContentFile(buffer.getvalue()))
+    return variants
+
+
+def flatten(image):
+    """RGB copy of ``image`` with any transparency composited onto white"""
+    from PIL import Image
+
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def delete_variants(storage, variants):
+    for names in (variants or {}).values():
+        for name in names.values():
+            try:
+                storage.delete(name)
+            except Exception:
+                logger.warning('Could not delete image variant %s', name, exc_info=True)
+
+
+def process(model, pk, field_name, name, stale):
+    """Job body: render variants for ``name`` and store them if it is still current"""
+    field = model._meta.get_field(field_name)
+    try:
+        delete_variants(field.storage, stale)
+        variants = render_variants(field.storage, name)
+        # Only record them if the row still holds this file
+        updated = model._default_manager.filter(pk=pk, **{field_name: name}).update(
+            **{variants_field(field_name): variants}
+        )
+        if updated:
+            variants_ready.send(sender=model, pk=pk, field=field_name)
+        else:
+            delete_variants(field.storage, variants)
+    except Exception:
+        logger.exception('Image variants failed for %s %s.%s', model.__name__, pk, field_name)
+    finally:
+        if settings.IMAGE_VARIANTS['MODE'] != 'sync':
+            # Pool threads open their own connection; don't leave it dangling
+            connection.close()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_VARIANTS['WORKERS'], thread_name_prefix='image-variants'
+                )
+    return _executor
+
+
+def schedule(model, pk, field_name, name, stale=None):
+    def enqueue():
+        if settings.IMAGE_VARIANTS['MODE'] == 'sync':
+            process(model, pk, field_name, name, stale)
+        else:
+            get_executor().submit(process, model, pk, field_name, name, stale)
+
+    transaction.on_commit(enqueue)
+
+
+def _file_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+# {model: [registered image field names]}
+_registered = {}
+
+
+def image_changed(instance, field_name):
+    """Whether ``instance`` holds a new file for ``field_name`` since it was loaded"""
+    if field_name not in instance.__dict__:
+        return False
+    file = getattr(instance, field_name)
+    saved = getattr(instance, f'_saved_{field_name}', None)
+    # A fresh upload is uncommitted until FileField.pre_save stores it
+    return not getattr(file, '_committed', True) or (saved is not None and _file_name(file) != saved[0])
+
+
+def unchanged_variant_fields(instance):
+    """``*_variants`` fields a full save must not write back.
+
+    Their image is unchanged, so the copy loaded with ``instance`` may predate
+    variants a job has stored since; writing it would erase them for good.
+    """
+    return [
+        variants_field(field_name) for field_name in _registered.get(type(instance), ())
+        if not image_changed(instance, field_name)
+    ]
+
+
+class PreserveVariantsMixin:
+    """Model mixin: full saves of existing rows leave ``unchanged_variant_fields`` alone"""
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            skip = unchanged_variant_fields(self)
+            if skip:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in skip
+                ]
+        super().save(*args, **kwargs)
+
+
+def register(model, field_name):
+    """Generate variants whenever ``model.<field_name>`` gets a new file.
+
+    The model should use ``PreserveVariantsMixin`` (or exclude
+    ``unchanged_variant_fields`` from its own forced ``update_fields``).
+    """
+    variants_attr = variants_field(field_name)
+    saved_attr = f'_saved_{field_name}'
+    changed_attr = f'_{field_name}_changed'
+    uid = f'image-variants-{model._meta.label}-{field_name}'
+    _registered.setdefault(model, []).append(field_name)
+
+    def remember(sender, instance, **kwargs):
+        # Read from __dict__ so deferred fields are never loaded just for this
+        if field_name in instance.__dict__:
+            saved = (_file_name(instance.__dict__[field_name]), instance.__dict__.get(variants_attr))
+        else:
+            saved = None
+        setattr(instance, saved_attr, saved)
+
+    def reset(sender, instance, raw=False, **kwargs):
+        changed = not raw and image_changed(instance, field_name)
+        if changed:
+            # Written in the same save as the new file, so old variants are never served with it
+            setattr(instance, variants_attr, {})
+        setattr(instance, changed_attr, changed)
+
+    def enqueue(sender, instance, raw=False, **kwargs):
+        if not raw and getattr(instance, changed_attr, False):
+            saved = getattr(instance, saved_attr)
+            stale = saved[1] if saved else None
+            name = _file_name(getattr(instance, field_name))
+            if name:
+                schedule(sender, instance.pk, field_name, name, stale=stale)
+            elif stale:
+                storage = sender._meta.get_field(field_name).storage
+                transaction.on_commit(lambda: delete_variants(storage, stale))
+        remember(sender, instance)
+
+    def cleanup(sender, instance, **kwargs):
+        variants = instance.__dict__.get(variants_attr)
+        if variants:
+            storage = sender._meta.get_field(field_name).storage
+            transaction.on_commit(lambda: delete_variants(storage, variants))
+
+    post_init.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+    pre_save.connect(reset, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(enqueue, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(cleanup, sender=model, weak=False, dispatch_uid=uid)
+
+
+class SrcsetField(serializers.Field):
+    """``{'original': url, 'webp': {width: url}, 'jpeg': {width: url}}`` for an image field.
+
+    Only ``original`` is present until the variants have been generated.
+    """
+
+    def __init__(self, field_name, **kwargs):
+        self.image_field_name = field_name
+        # For aiverse_api.fieldsets: the columns this field reads
+        self.model_dependencies = [field_name, variants_field(field_name)]
+        kwargs.setdefault('source', '*')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        file = getattr(instance, self.image_field_name)
+        if not file:
+            return None
+        request = self.context.get('request')
+
+        def absolute(url):
+            return request.build_absolute_uri(url) if request else url
+
+        srcset = {'original': absolute(file.url)}
+        for fmt, names in (getattr(instance, variants_field(self.image_field_name)) or {}).items():
+            srcset[fmt] = {width: absolute(file.storage.url(name)) for width, name in names.items()}
+        return srcset
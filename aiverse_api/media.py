@@ -0,0 +1,184 @@
+"""
+Serving uploaded media without tying up a worker per download.
+
+``VersionedMediaStorage`` stores every file under a name carrying a hash of
+its content (``photo.3f2a9c1b04de.jpg``), so a name only ever holds one set of
+bytes and its URL can be cached for a year without touching the disk to build
+it. ``serve_media`` answers ``If-None-Match`` / ``If-Modified-Since`` with a
+304 and single ``Range`` requests with a 206. With
+``settings.MEDIA_SERVING['OFFLOAD']`` set, the bytes are handed to the front
+proxy (``X-Accel-Redirect`` for nginx, ``X-Sendfile`` for Apache/lighttpd);
+otherwise whole files go out through ``FileResponse``, which the ASGI handler
+reads and sends in chunks from a worker thread, so production should offload.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# ``<stem>.<hash>[_<suffix>].<ext>``; the suffix is added when a name is taken
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}(?:_[A-Za-z0-9]{7})?\.[^./]+$')
+CHUNK_SIZE = 64 * 1024
+
+
+def file_version(stat):
+    """Short token that changes whenever the file is rewritten"""
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+
+def content_hash(content):
+    digest = hashlib.md5(usedforsecurity=False)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()[:12]
+
+
+def hashed_name(name, content):
+    """``event_gallery/photo.jpg`` -> ``event_gallery/photo.<hash of content>.jpg``"""
+    root, ext = posixpath.splitext(name)
+    return f'{root}.{content_hash(content)}{ext}'
+
+
+def is_hashed(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+class VersionedMediaStorage(FileSystemStorage):
+    """``FileSystemStorage`` that puts a content hash in every name it saves"""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        return super().save(hashed_name(name, content), content, max_length=max_length)
+
+
+def parse_range(header, size):
+    """``(start, end)`` for a single satisfiable byte range, None to ignore the header.
+
+    Raises ``ValueError`` when the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Malformed or multi-range; serving the whole file is always allowed
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+        if int(last) == 0:
+            raise ValueError
+    if start >= size:
+        raise ValueError
+    return start, end
+
+
+def range_applies(request, etag, mtime):
+    """``If-Range`` lets a client resume only while its copy is still current"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    timestamp = parse_http_date_safe(if_range)
+    return timestamp is not None and int(mtime) <= timestamp
+
+
+def iter_range(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def offload(path, full_path, content_type):
+    """Empty response telling the front proxy to send the file itself"""
+    options = settings.MEDIA_SERVING
+    response = HttpResponse(content_type=content_type)
+    if options['OFFLOAD'] == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = posixpath.join(options['ACCEL_PREFIX'], quote(path))
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from ``MEDIA_ROOT`` with validators, ranges and long-lived caching"""
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404('File not found')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found')
+
+    options = settings.MEDIA_SERVING
+    version = file_version(stat)
+    etag = quote_etag(version)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        if options['OFFLOAD']:
+            # The proxy handles Range and Content-Length from here
+            response = offload(path, full_path, content_type)
+        else:
+            response = file_response(request, full_path, stat, etag, content_type)
+            if response.status_code == 416:
+                return response
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if is_hashed(path):
+        patch_cache_control(response, public=True, max_age=options['IMMUTABLE_MAX_AGE'], immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=options['MAX_AGE'])
+    return response
+
+
+def file_response(request, full_path, stat, etag, content_type):
+    size = stat.st_size
+    header = request.META.get('HTTP_RANGE')
+    if header and size and range_applies(request, etag, stat.st_mtime):
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                iter_range(open(full_path, 'rb'), start, length), status=206, content_type=content_type
+            )
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            return response
+
+    # A real file object lets a WSGI server's file_wrapper use sendfile(2); ASGI reads it in chunks
+    return FileResponse(open(full_path, 'rb'), content_type=content_type)
@@ -0,0 +1,193 @@
+"""
+Project-wide middleware.
+"""
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from .compression import available_codings, compressed, is_compressible, negotiate
+from .queries import repeated_templates, sql_template
+
+logger = logging.getLogger('aiverse_api.requests')
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that times every SQL statement of a request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = (0.0, '')
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            self.statements.append(sql)
+            if elapsed > self.slowest[0]:
+                self.slowest = (elapsed, sql)
+
+
+class RequestInstrumentationMiddleware:
+    """Per-request SQL and timing breakdown as a Server-Timing header and log line.
+
+    Configured by ``settings.REQUEST_INSTRUMENTATION``. When disabled the
+    middleware removes itself at startup; ``SAMPLE_RATE`` instruments only a
+    fraction of requests.
+    """
+
+    def __init__(self, get_response):
+        options = settings.REQUEST_INSTRUMENTATION
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = options['SAMPLE_RATE']
+        self.n_plus_one_threshold = options['N_PLUS_ONE_THRESHOLD']
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        render = getattr(request, '_instrumentation_render', 0.0)
+        timings = {
+            'db': recorder.duration,
+            'render': render,
+            'app': max(total - recorder.duration - render, 0.0),
+            'total': total,
+        }
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={seconds * 1000:.1f}' + (f';desc="{recorder.count} queries"' if name == 'db' else '')
+            for name, seconds in timings.items()
+        )
+
+        logger.info(
+            'method=%s path=%s status=%s total_ms=%.1f db_ms=%.1f queries=%d render_ms=%.1f '
+            'slowest_ms=%.1f slowest_sql="%s"',
+            request.method, request.path, response.status_code, total * 1000,
+            recorder.duration * 1000, recorder.count, render * 1000,
+            recorder.slowest[0] * 1000, sql_template(recorder.slowest[1])[:200],
+        )
+        for template, repeats in repeated_templates(recorder.statements, self.n_plus_one_threshold).items():
+            logger.warning(
+                'Likely N+1 on %s %s: %d executions of "%s"',
+                request.method, request.path, repeats, template[:200],
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that step
+        view_finished = time.perf_counter()
+
+        def record_render(rendered):
+            request._instrumentation_render = time.perf_counter() - view_finished
+
+        response.add_post_render_callback(record_render)
+        return response
+
+
+class CompressionMiddleware:
+    """Compress API responses with the best coding the client accepts (br, zstd, gzip).
+
+    Configured by ``settings.RESPONSE_COMPRESSION``: only paths under
+    ``PATH_PREFIXES`` (minus ``EXCLUDE_PREFIXES``), only compressible content
+    types of at least ``MIN_SIZE`` bytes, and never streaming responses (SSE,
+    exports). Compressed bodies of public responses with a strong ``ETag`` are
+    cached for ``CACHE_TIMEOUT`` seconds; the ETag sent is then weak, and
+    so is the one on 304s for clients that would get a compressed 200.
+    """
+
+    def __init__(self, get_response):
+        options = settings.RESPONSE_COMPRESSION
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.path_prefixes = tuple(options['PATH_PREFIXES'])
+        self.exclude_prefixes = tuple(options['EXCLUDE_PREFIXES'])
+        self.min_size = options['MIN_SIZE']
+        self.levels = options['LEVELS']
+        self.cache_timeout = options['CACHE_TIMEOUT']
+        self.codings = available_codings()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.status_code == 304 and self.in_scope(request):
+            # Match the headers of the 200 being revalidated, so a shared cache
+            # refreshing its stored copy from this 304 keeps a weak ETag on it
+            patch_vary_headers(response, ('Accept-Encoding',))
+            if negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codings):
+                self.weaken_etag(response)
+            return response
+        if not self.applies(request, response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codings)
+        if coding is None:
+            return response
+
+        etag = response.get('ETag') if self.cacheable(request, response) else None
+        body = compressed(
+            response.content, coding, self.levels[coding], self.codings[coding],
+            etag=etag, timeout=self.cache_timeout,
+        )
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = coding
+        self.weaken_etag(response)
+        return response
+
+    @staticmethod
+    def weaken_etag(response):
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # Same representation, different bytes: only a weak match now
+            response['ETag'] = 'W/' + etag
+
+    def in_scope(self, request):
+        path = request.path_info
+        return path.startswith(self.path_prefixes) and not path.startswith(self.exclude_prefixes)
+
+    def applies(self, request, response):
+        return (
+            self.in_scope(request)
+            and not response.streaming
+            and 200 <= response.status_code < 300
+            and response.status_code not in (204, 206)
+            and not response.has_header('Content-Encoding')
+            and is_compressible(response.get('Content-Type', ''))
+            and len(response.content) >= self.min_size
+        )
+
+    @staticmethod
+    def cacheable(request, response):
+        """Whether the compressed body may be cached under the response's ETag"""
+        etag = response.get('ETag', '')
+        cache_control = response.get('Cache-Control', '').lower()
+        return (
+            request.method in ('GET', 'HEAD')
+            and etag.startswith('"')
+            and 'private' not in cache_control
+            and 'no-store' not in cache_control
+        )
@@ -0,0 +1,39 @@
+"""
+Keyset (cursor) pagination for the high-volume list endpoints.
+
+Pages are fetched with ``WHERE <position> < %s ORDER BY ... LIMIT n`` rather
+than ``OFFSET``, and without the ``COUNT(*)`` page-number pagination runs on
+every page. Each ordering ends with ``id`` so rows sharing a timestamp keep a
+stable order; DRF's cursor carries a small offset to step through such ties.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-id',)
+
+
+class PaymentPagination(KeysetPagination):
+    ordering = ('-submitted_at', '-id')
+
+
+class RegistrationPagination(KeysetPagination):
+    ordering = ('-registered_at', '-id')
+
+
+class UserPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class ActivityPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+
+
+class UpcomingEventPagination(KeysetPagination):
+    ordering = ('date', 'id')
+
+
+class PastEventPagination(KeysetPagination):
+    ordering = ('-date', '-id')
@@ -0,0 +1,24 @@
+"""
+Helpers for reasoning about captured SQL.
+"""
+import re
+from collections import Counter
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def sql_template(sql):
+    """Reduce a SQL statement to its shape by replacing literals with ``?``"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def repeated_templates(statements, threshold):
+    """``{template: count}`` for SQL shapes executed more than ``threshold`` times"""
+    counts = Counter(sql_template(sql) for sql in statements)
+    return {template: count for template, count in counts.items() if count > threshold}
@@ -0,0 +1,409 @@
+"""
+Full-text search indexes kept beside the searched tables.
+
+A ``SearchIndex`` names a model, its weighted text columns and (optionally)
+the column snippets are cut from. Its storage depends on the database:
+
+- PostgreSQL: a ``tsvector`` column (``search_document``) on the model's table
+  with a GIN index, written from ``setweight(to_tsvector(...))``;
+  ``TrigramSearchIndex`` instead puts a ``pg_trgm`` GIN index on an expression
+  over the columns, which Postgres maintains itself;
+- SQLite: an FTS5 shadow table ``<table>_fts`` whose rowid is the model pk.
+
+``install``/``uninstall`` are used from migrations, and so are
+``install_triggers``/``uninstall_triggers``: triggers keep the index current
+inside the statement that writes the row (``update()`` and raw SQL
+included), so saves make no extra query. ``rebuild()`` / the
+``rebuild_search_index`` command refill an index from scratch.
+``search()`` returns ranked instances with a highlighted ``search_snippet``
+and ``filter()`` narrows a queryset to matches without ranking. Other
+databases, or SQLite without FTS5, fall back to ``icontains``.
+"""
+import html
+import logging
+import re
+from functools import reduce
+from operator import and_, or_
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_COLUMN = 'search_document'
+TEXT_SEARCH_CONFIG = 'english'
+MAX_TERMS = 8
+# bm25() column weights standing in for the tsvector A-D weights
+BM25_WEIGHTS = {'A': 10.0, 'B': 4.0, 'C': 2.0, 'D': 1.0}
+# Highlight markers: control characters that can't occur in the indexed text,
+# swapped for <mark> after the snippet is HTML-escaped
+MARK_START, MARK_END = '\x02', '\x03'
+
+# Every SearchIndex, for rebuild_search_index
+registry = []
+
+
+def query_terms(text):
+    """Lower-cased word tokens of a user query (at most ``MAX_TERMS``)"""
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+def highlight(snippet):
+    if snippet is None:
+        return None
+    escaped = html.escape(snippet)
+    return escaped.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+class SearchIndex:
+    """Weighted full-text index over ``fields`` (``{field name: 'A'..'D'}``) of ``model``"""
+
+    tokenize = 'porter unicode61 remove_diacritics 2'
+
+    def __init__(self, model, fields, snippet_field=None):
+        self.model = model
+        self.fields = fields
+        self.snippet_field = snippet_field
+        self._available = set()
+        registry.append(self)
+
+    @property
+    def table(self):
+        return self.model._meta.db_table
+
+    @property
+    def fts_table(self):
+        return f'{self.table}_fts'
+
+    @property
+    def index_name(self):
+        return f'{self.table}_search_idx'
+
+    def columns(self):
+        return [self.model._meta.get_field(name).column for name in self.fields]
+
+    def backend(self, connection):
+        """'postgresql', 'sqlite' (FTS5 table present) or None for the icontains fallback"""
+        if connection.vendor == 'postgresql':
+            return 'postgresql'
+        if connection.vendor != 'sqlite':
+            return None
+        key = str(connection.settings_dict['NAME'])
+        if key not in self._available:
+            # Only remember hits; a missing table may be created by a later migration
+            if self.fts_table not in connection.introspection.table_names():
+                return None
+            self._available.add(key)
+        return 'sqlite'
+
+    @property
+    def trigger_prefix(self):
+        return f'{self.table}_search'
+
+    def document_sql(self, connection, prefix=''):
+        """``tsvector`` expression over the weighted columns of the current row (``prefix`` e.g. ``NEW.``)"""
+        qn = connection.ops.quote_name
+        return ' || '.join(
+            f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce({prefix}{qn(column)}, '')), '{weight}')"
+            for column, weight in zip(self.columns(), self.fields.values())
+        )
+
+    # Schema
+
+    def install(self, schema_editor):
+        """Create and fill the index (for ``RunPython`` in a migration)"""
+        connection = schema_editor.connection
+        qn = connection.ops.quote_name
+        if connection.vendor == 'postgresql':
+            self.install_postgres(schema_editor)
+        elif connection.vendor == 'sqlite':
+            columns = ', '.join(qn(column) for column in self.columns())
+            try:
+                schema_editor.execute(
+                    f'CREATE VIRTUAL TABLE {qn(self.fts_table)} USING fts5({columns}, '
+                    f"tokenize='{self.tokenize}', prefix='2 3')"
+                )
+            except OperationalError:
+                logger.warning('SQLite was built without FTS5; %s search falls back to icontains', self.table)
+                return
+        else:
+            return
+        self.rebuild(connection.alias)
+
+    def uninstall(self, schema_editor):
+        connection = schema_editor.connection
+        self.uninstall_triggers(schema_editor)
+        if connection.vendor == 'postgresql':
+            self.uninstall_postgres(schema_editor)
+        elif connection.vendor == 'sqlite':
+            schema_editor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(self.fts_table)}')
+        self._available.clear()
+
+    def install_postgres(self, schema_editor):
+        qn = schema_editor.connection.ops.quote_name
+        schema_editor.execute(f'ALTER TABLE {qn(self.table)} ADD COLUMN {qn(DOCUMENT_COLUMN)} tsvector')
+        schema_editor.execute(
+            f'CREATE INDEX {qn(self.index_name)} ON {qn(self.table)} USING GIN ({qn(DOCUMENT_COLUMN)})'
+        )
+
+    def uninstall_postgres(self, schema_editor):
+        qn = schema_editor.connection.ops.quote_name
+        schema_editor.execute(f'DROP INDEX IF EXISTS {qn(self.index_name)}')
+        schema_editor.execute(f'ALTER TABLE {qn(self.table)} DROP COLUMN IF EXISTS {qn(DOCUMENT_COLUMN)}')
+
+    def install_triggers(self, schema_editor):
+        """Maintain the index from triggers on the table (for ``RunPython`` in a migration)"""
+        connection = schema_editor.connection
+        qn = connection.ops.quote_name
+        if connection.vendor == 'postgresql':
+            self.install_postgres_triggers(schema_editor)
+        elif self.backend(connection) == 'sqlite':
+            fts = qn(self.fts_table)
+            pk = qn(self.model._meta.pk.column)
+            columns = ', '.join(qn(column) for column in self.columns())
+            values = ', '.join(f"coalesce(new.{qn(column)}, '')" for column in self.columns())
+            # Only writes to the indexed columns touch the index (not e.g. last_login)
+            statements = {
+                'insert': f'AFTER INSERT ON {qn(self.table)}',
+                'update': f'AFTER UPDATE OF {columns} ON {qn(self.table)}',
+            }
+            for name, event in statements.items():
+                schema_editor.execute(
+                    f'CREATE TRIGGER IF NOT EXISTS {qn(f"{self.trigger_prefix}_{name}")} {event} BEGIN '
+                    f'INSERT OR REPLACE INTO {fts} (rowid, {columns}) VALUES (new.{pk}, {values}); END'
+                )
+            schema_editor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {qn(f"{self.trigger_prefix}_delete")} '
+                f'AFTER DELETE ON {qn(self.table)} BEGIN DELETE FROM {fts} WHERE rowid = old.{pk}; END'
+            )
+
+    def uninstall_triggers(self, schema_editor):
+        connection = schema_editor.connection
+        qn = connection.ops.quote_name
+        if connection.vendor == 'postgresql':
+            self.uninstall_postgres_triggers(schema_editor)
+        elif connection.vendor == 'sqlite':
+            for name in ('insert', 'update', 'delete'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {qn(f"{self.trigger_prefix}_{name}")}')
+
+    def install_postgres_triggers(self, schema_editor):
+        connection = schema_editor.connection
+        qn = connection.ops.quote_name
+        columns = ', '.join(qn(column) for column in self.columns())
+        schema_editor.execute(
+            f'CREATE OR REPLACE FUNCTION {qn(self.trigger_prefix)}() RETURNS trigger LANGUAGE plpgsql AS $$ '
+            f'BEGIN NEW.{qn(DOCUMENT_COLUMN)} := {self.document_sql(connection, prefix="NEW.")}; RETURN NEW; END $$'
+        )
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {qn(self.trigger_prefix)} ON {qn(self.table)}')
+        schema_editor.execute(
+            f'CREATE TRIGGER {qn(self.trigger_prefix)} BEFORE INSERT OR UPDATE OF {columns} '
+            f'ON {qn(self.table)} FOR EACH ROW EXECUTE FUNCTION {qn(self.trigger_prefix)}()'
+        )
+
+    def uninstall_postgres_triggers(self, schema_editor):
+        qn = schema_editor.connection.ops.quote_name
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {qn(self.trigger_prefix)} ON {qn(self.table)}')
+        schema_editor.execute(f'DROP FUNCTION IF EXISTS {qn(self.trigger_prefix)}()')
+
+    # Sync
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        """Recompute the whole index from the table"""
+        connection = connections[using]
+        backend = self.backend(connection)
+        qn = connection.ops.quote_name
+        pk = qn(self.model._meta.pk.column)
+        with connection.cursor() as cursor:
+            if backend == 'postgresql':
+                cursor.execute(
+                    f'UPDATE {qn(self.table)} SET {qn(DOCUMENT_COLUMN)} = {self.document_sql(connection)}'
+                )
+            elif backend == 'sqlite':
+                fts = qn(self.fts_table)
+                columns = ', '.join(qn(column) for column in self.columns())
+                cursor.execute(f'DELETE FROM {fts}')
+                cursor.execute(
+                    f'INSERT INTO {fts} (rowid, {columns}) SELECT {pk}, {columns} FROM {qn(self.table)}'
+                )
+
+    # Queries
+
+    def search(self, queryset, text, limit=20):
+        """Up to ``limit`` instances of ``queryset`` matching ``text``, best first.
+
+        Every term is prefix-matched and all must occur. Each instance gets
+        ``search_rank`` (higher is better) and ``search_snippet`` (HTML with
+        ``<mark>`` around matches, or None).
+        """
+        terms = query_terms(text)
+        if not terms:
+            return []
+        connection = connections[queryset.db]
+        backend = self.backend(connection)
+        if backend is None:
+            return self.fallback_search(queryset, terms, limit)
+
+        if backend == 'postgresql':
+            sql, params, key = self.postgres_sql(connection, terms)
+        else:
+            sql, params, key = self.sqlite_sql(connection, terms)
+
+        # Restrict to the queryset's rows when it is filtered
+        if queryset.query.where:
+            subquery, subparams = queryset.order_by().values('pk').query.sql_with_params()
+            sql += f' AND {key} IN ({subquery})'
+            params += list(subparams)
+        sql += f' ORDER BY score DESC, {key} DESC LIMIT %s'
+        params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            hits = cursor.fetchall()
+
+        instances = queryset.in_bulk([hit[0] for hit in hits])
+        results = []
+        for pk, score, snippet in hits:
+            instance = instances.get(pk)
+            if instance is not None:
+                instance.search_rank = float(score)
+                instance.search_snippet = highlight(snippet)
+                results.append(instance)
+        return results
+
+    def filter(self, queryset, text):
+        """``queryset`` narrowed to rows matching ``text``, in its own ordering"""
+        terms = query_terms(text)
+        if not terms:
+            return queryset
+        connection = connections[queryset.db]
+        backend = self.backend(connection)
+        if backend is None:
+            return self.fallback_filter(queryset, terms)
+        if backend == 'postgresql':
+            sql, params = self.postgres_condition(connection, terms)
+            return queryset.filter(RawSQL(sql, params, output_field=BooleanField()))
+        fts = connection.ops.quote_name(self.fts_table)
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [self.sqlite_match(terms)])
+        )
+
+    def postgres_tsquery(self, terms):
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def postgres_condition(self, connection, terms):
+        qn = connection.ops.quote_name
+        return (
+            f"{qn(self.table)}.{qn(DOCUMENT_COLUMN)} @@ to_tsquery('{TEXT_SEARCH_CONFIG}', %s)",
+            [self.postgres_tsquery(terms)],
+        )
+
+    def postgres_sql(self, connection, terms):
+        qn = connection.ops.quote_name
+        pk = qn(self.model._meta.pk.column)
+        params = [self.postgres_tsquery(terms)]
+        if self.snippet_field:
+            options = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=10, MaxFragments=2'
+            snippet_column = qn(self.model._meta.get_field(self.snippet_field).column)
+            snippet = f"ts_headline('{TEXT_SEARCH_CONFIG}', coalesce({snippet_column}, ''), query, %s)"
+            params.insert(0, options)
+        else:
+            snippet = 'NULL'
+        sql = (
+            f'SELECT {pk}, ts_rank_cd({qn(DOCUMENT_COLUMN)}, query) AS score, {snippet} '
+            f"FROM {qn(self.table)}, to_tsquery('{TEXT_SEARCH_CONFIG}', %s) query "
+            f'WHERE {qn(DOCUMENT_COLUMN)} @@ query'
+        )
+        return sql, params, pk
+
+    def sqlite_match(self, terms):
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def sqlite_sql(self, connection, terms):
+        fts = connection.ops.quote_name(self.fts_table)
+        weights = ', '.join(str(BM25_WEIGHTS[weight]) for weight in self.fields.values())
+        if self.snippet_field:
+            snippet_index = list(self.fields).index(self.snippet_field)
+            snippet = f"snippet({fts}, {snippet_index}, '{MARK_START}', '{MARK_END}', '…', 24)"
+        else:
+            snippet = 'NULL'
+        # bm25() is lower for better matches; negate it so scores sort like ts_rank_cd
+        sql = (
+            f'SELECT rowid, -bm25({fts}, {weights}) AS score, {snippet} '
+            f'FROM {fts} WHERE {fts} MATCH %s'
+        )
+        return sql, [self.sqlite_match(terms)], 'rowid'
+
+    def fallback_filter(self, queryset, terms):
+        matches = [
+            reduce(or_, (Q(**{f'{name}__icontains': term}) for name in self.fields))
+            for term in terms
+        ]
+        return queryset.filter(reduce(and_, matches))
+
+    def fallback_search(self, queryset, terms, limit):
+        results = list(self.fallback_filter(queryset, terms).order_by('-pk')[:limit])
+        for instance in results:
+            instance.search_rank = 0.0
+            instance.search_snippet = None
+        return results
+
+
+class TrigramSearchIndex(SearchIndex):
+    """``SearchIndex`` for short identifying text (names, emails, phone numbers).
+
+    On PostgreSQL the columns are matched through a ``pg_trgm`` GIN index on
+    ``lower(col1 || ' ' || col2 ...)``: each term must start a word
+    (``~ '\\mterm'``), and results are ranked by ``word_similarity``. The index
+    is on an expression, so there is nothing to write on save. SQLite uses the
+    FTS5 table without stemming, kept by the same triggers as ``SearchIndex``.
+    """
+
+    tokenize = 'unicode61 remove_diacritics 2'
+
+    def document_sql(self, connection, qualified=False):
+        """The indexed expression, optionally with table-qualified columns"""
+        qn = connection.ops.quote_name
+        prefix = f'{qn(self.table)}.' if qualified else ''
+        joined = " || ' ' || ".join(f"coalesce({prefix}{qn(column)}, '')" for column in self.columns())
+        return f'lower({joined})'
+
+    def install_postgres(self, schema_editor):
+        qn = schema_editor.connection.ops.quote_name
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX {qn(self.index_name)} ON {qn(self.table)} '
+            f'USING GIN (({self.document_sql(schema_editor.connection)}) gin_trgm_ops)'
+        )
+
+    def uninstall_postgres(self, schema_editor):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.connection.ops.quote_name(self.index_name)}')
+
+    def install_postgres_triggers(self, schema_editor):
+        pass
+
+    def uninstall_postgres_triggers(self, schema_editor):
+        pass
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        if self.backend(connections[using]) != 'postgresql':
+            super().rebuild(using)
+
+    def word_patterns(self, terms):
+        # Terms are \w+ runs, so they carry no regex metacharacters
+        return [rf'\m{term}' for term in terms]
+
+    def postgres_condition(self, connection, terms):
+        document = self.document_sql(connection, qualified=True)
+        return ' AND '.join(f'{document} ~ %s' for _ in terms), self.word_patterns(terms)
+
+    def postgres_sql(self, connection, terms):
+        pk = connection.ops.quote_name(self.model._meta.pk.column)
+        document = self.document_sql(connection)
+        score = ' + '.join(f'word_similarity(%s, {document})' for _ in terms)
+        condition = ' AND '.join(f'{document} ~ %s' for _ in terms)
+        sql = (
+            f'SELECT {pk}, ({score}) AS score, NULL '
+            f'FROM {connection.ops.quote_name(self.table)} WHERE {condition}'
+        )
+        return sql, [*terms, *self.word_patterns(terms)], pk
@@ -51,6 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'aiverse_api.middleware.RequestInstrumentationMiddleware',  # No-op unless enabled
+    'aiverse_api.middleware.CompressionMiddleware',  # gzip/br/zstd for /api/ responses
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Whitenoise for static files
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -100,6 +102,97 @@ else:
         }
     }
 
+# Cache - Redis (requires the redis package) when REDIS_URL is set so every
+# worker shares one cache, per-process memory otherwise
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'aiverse',
+        }
+    }
+
+# Seconds a cached dashboard payload may live; writes invalidate it sooner
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 300))
+
+# Writes invalidate the dashboard cache in the cache backend, so caching only
+# stays correct across workers with a shared backend (REDIS_URL). Without one
+# the dashboard is computed per request; set DASHBOARD_CACHE=true to cache
+# anyway on a single-process server.
+DASHBOARD_CACHE = os.environ.get('DASHBOARD_CACHE', 'true' if REDIS_URL else 'false').lower() == 'true'
+
+# Activity log - buffered writes flushed by size/time; 'sync' inserts immediately
+ACTIVITY_LOG = {
+    'MODE': os.environ.get('ACTIVITY_LOG_MODE', 'buffered'),
+    'BATCH_SIZE': int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', 50)),
+    'FLUSH_INTERVAL': float(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL', 2.0)),
+}
+
+# Cache-Control for public read endpoints answered with ETag/Last-Modified (events):
+# browsers revalidate every time, shared caches/CDNs may reuse a copy for s-maxage
+PUBLIC_CACHE_CONTROL = {
+    'public': True,
+    'max_age': int(os.environ.get('PUBLIC_CACHE_MAX_AGE', 0)),
+    's_maxage': int(os.environ.get('PUBLIC_CACHE_S_MAXAGE', 30)),
+    'stale_while_revalidate': int(os.environ.get('PUBLIC_CACHE_STALE_WHILE_REVALIDATE', 30)),
+}
+
+# Event that registrations and payments attach to when the request names none
+# (?event_slug=); falls back to the next upcoming event
+ACTIVE_EVENT = {
+    'SLUG': os.environ.get('ACTIVE_EVENT_SLUG', 'ai-verse-4'),
+    'CACHE_TTL': float(os.environ.get('ACTIVE_EVENT_CACHE_TTL', 60)),
+}
+
+# /api/events/timeline/ is cached until the next event starts or ends, but never
+# longer than this (seconds)
+EVENT_TIMELINE = {
+    'CACHE_MAX_TTL': int(os.environ.get('EVENT_TIMELINE_CACHE_MAX_TTL', 3600)),
+}
+
+# Live admin activity feed (Server-Sent Events). 'database' polls for writes
+# from every worker; 'local' only sees events published in the same process.
+ACTIVITY_STREAM = {
+    'BROKER': os.environ.get('ACTIVITY_STREAM_BROKER', 'database'),
+    'POLL_INTERVAL': float(os.environ.get('ACTIVITY_STREAM_POLL_INTERVAL', 1.0)),
+    'HEARTBEAT': 15,
+    'REPLAY_LIMIT': 100,
+    'RETRY': 3000,
+}
+
+# Per-request SQL/timing instrumentation (Server-Timing header + log lines)
+REQUEST_INSTRUMENTATION = {
+    'ENABLED': os.environ.get('REQUEST_INSTRUMENTATION', 'False').lower() == 'true',
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_INSTRUMENTATION_SAMPLE_RATE', 1.0)),
+    'N_PLUS_ONE_THRESHOLD': int(os.environ.get('REQUEST_INSTRUMENTATION_N_PLUS_ONE', 10)),
+}
+
+# Compression of API responses (br needs the brotli package, zstd the zstandard
+# package; gzip is always available). Auth responses carry tokens and are left
+# uncompressed.
+RESPONSE_COMPRESSION = {
+    'ENABLED': os.environ.get('RESPONSE_COMPRESSION', 'True').lower() == 'true',
+    'PATH_PREFIXES': ('/api/',),
+    'EXCLUDE_PREFIXES': ('/api/auth/',),
+    'MIN_SIZE': int(os.environ.get('RESPONSE_COMPRESSION_MIN_SIZE', 1024)),
+    'LEVELS': {
+        'gzip': int(os.environ.get('RESPONSE_COMPRESSION_GZIP_LEVEL', 6)),
+        'br': int(os.environ.get('RESPONSE_COMPRESSION_BROTLI_LEVEL', 5)),
+        'zstd': int(os.environ.get('RESPONSE_COMPRESSION_ZSTD_LEVEL', 3)),
+    },
+    # Seconds compressed bodies of ETag'd public responses (event lists) are kept
+    'CACHE_TIMEOUT': int(os.environ.get('RESPONSE_COMPRESSION_CACHE_TIMEOUT', 300)),
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -130,6 +223,33 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+DEFAULT_FILE_STORAGE = 'aiverse_api.media.VersionedMediaStorage'
+
+# Media serving (aiverse_api.media). OFFLOAD hands the bytes to the front proxy:
+# 'x-accel-redirect' (nginx, internal location at ACCEL_PREFIX aliased to
+# MEDIA_ROOT) or 'x-sendfile' (Apache/lighttpd). Names carrying a content hash
+# (everything VersionedMediaStorage saves) are cached for IMMUTABLE_MAX_AGE,
+# anything else for MAX_AGE.
+MEDIA_SERVING = {
+    'OFFLOAD': os.environ.get('MEDIA_OFFLOAD', '').lower(),
+    'ACCEL_PREFIX': os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/'),
+    'MAX_AGE': int(os.environ.get('MEDIA_MAX_AGE', 3600)),
+    'IMMUTABLE_MAX_AGE': 31536000,
+}
+
+# Responsive copies of uploaded images (aiverse_api.images); MODE=sync renders
+# them inline after commit instead of on the worker pool
+IMAGE_VARIANTS = {
+    'MODE': os.environ.get('IMAGE_VARIANTS_MODE', 'background'),
+    'WORKERS': int(os.environ.get('IMAGE_VARIANTS_WORKERS', 2)),
+    'WIDTHS': [int(width) for width in os.environ.get('IMAGE_VARIANTS_WIDTHS', '320,640,1280').split(',')],
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': int(os.environ.get('IMAGE_VARIANTS_QUALITY', 80)),
+}
+
+# Folder holding the frontend's public/gallery/<Event.gallery_dir> images, scanned
+# into Event.gallery_manifest (events.gallery); unset disables scanning
+GALLERY_ROOT = os.environ.get('GALLERY_ROOT', '')
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -147,6 +267,16 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
+    # Same output as DRF's JSON renderer/parser, encoded by orjson when installed
+    'DEFAULT_RENDERER_CLASSES': (
+        'aiverse_api.fastjson.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'aiverse_api.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # JWT settings
@@ -0,0 +1,210 @@
+import gzip
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from PIL import Image
+
+from events import resolver
+from events.models import Event, EventImage
+from payments.models import Payment
+
+from .compression import negotiate
+
+User = get_user_model()
+
+
+class NegotiateTests(SimpleTestCase):
+    codings = {'gzip': None, 'br': None}
+
+    def test_prefers_the_highest_q_value(self):
+        self.assertEqual(negotiate('gzip;q=1.0, br;q=0.5', self.codings), 'gzip')
+
+    def test_breaks_ties_by_server_preference(self):
+        self.assertEqual(negotiate('gzip, br', self.codings), 'br')
+
+    def test_skips_codings_not_installed(self):
+        self.assertEqual(negotiate('zstd, gzip;q=0.1', self.codings), 'gzip')
+
+    def test_wildcard_and_refusals(self):
+        self.assertEqual(negotiate('*', {'gzip': None}), 'gzip')
+        self.assertIsNone(negotiate('gzip;q=0, identity', self.codings))
+        self.assertIsNone(negotiate('', self.codings))
+
+
+class CompressionTests(TestCase):
+    """Compressed API responses and their 304s carry matching Vary and weak ETags"""
+
+    def setUp(self):
+        resolver.invalidate()
+        for n in range(3):
+            Event.objects.create(
+                title=f'Event {n}', slug=f'event-{n}', description='A long description. ' * 40,
+                venue='Main Hall', date=timezone.now() + timedelta(days=n + 1),
+            )
+
+    def get(self, encoding='gzip', **headers):
+        return self.client.get('/api/events/', HTTP_ACCEPT_ENCODING=encoding, **headers)
+
+    def test_gzip_response_is_the_identity_body_with_a_weak_etag(self):
+        plain = self.get(encoding='identity')
+        compressed = self.get()
+
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        self.assertTrue(plain['ETag'].startswith('"'))
+
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(compressed['ETag'], 'W/' + plain['ETag'])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(int(compressed['Content-Length']), len(compressed.content))
+
+    def test_304_matches_the_headers_of_the_compressed_200(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_304_keeps_a_strong_etag_for_identity_clients(self):
+        etag = self.get(encoding='identity')['ETag']
+        response = self.get(encoding='identity', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_weak_etag_revalidates_after_switching_encoding(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(encoding='identity', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_small_responses_are_sent_uncompressed(self):
+        response = self.client.get('/api/events/?fields=id', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+
+
+class SparseFieldsetTests(TestCase):
+    """``?fields=``/``?omit=``/``?expand=`` trim reads, reject unknown names and leave writes alone"""
+
+    def setUp(self):
+        resolver.invalidate()
+        self.event = Event.objects.create(
+            title='Event', slug='event', description='An event', venue='Main Hall',
+            date=timezone.now() + timedelta(days=1),
+        )
+        user = User.objects.create(email='payer@example.com', username='payer', full_name='Payer')
+        self.payment = Payment.objects.create(user=user, event=self.event, amount=Decimal('100.00'))
+
+    def test_unknown_names_are_a_400(self):
+        for url, name in (
+            ('/api/events/?fields=id,bogus', 'bogus'),
+            ('/api/events/?omit=nope', 'nope'),
+            (f'/api/events/{self.event.slug}/?fields=slug,titel', 'titel'),
+            ('/api/payments/?expand=missing', 'missing'),
+            # Known field, but not one that can be expanded
+            ('/api/payments/?expand=amount', 'amount'),
+        ):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(name, response.json()['detail'])
+
+    def test_fields_and_omit_trim_the_response(self):
+        row = self.client.get('/api/events/?fields=id,slug').json()['results'][0]
+        self.assertEqual(set(row), {'id', 'slug'})
+
+        row = self.client.get('/api/events/?omit=description,images').json()['results'][0]
+        self.assertNotIn('description', row)
+        self.assertNotIn('images', row)
+        self.assertIn('title', row)
+
+    def test_expand_nests_the_related_object(self):
+        row = self.client.get('/api/payments/?fields=id,user&expand=user').json()['results'][0]
+        self.assertEqual(row['user']['email'], 'payer@example.com')
+
+    def test_writes_ignore_the_parameters(self):
+        response = self.client.patch(
+            f'/api/payments/{self.payment.pk}/?fields=id&omit=notes',
+            {'notes': 'Checked'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['notes'], 'Checked')
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.notes, 'Checked')
+
+
+def upload(name='photo.jpg', color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (120, 80), color).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ImageVariantTests(TestCase):
+    """Variants stored by the job survive full saves of instances loaded before it ran"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = self.settings(
+            MEDIA_ROOT=media_root, IMAGE_VARIANTS={**settings.IMAGE_VARIANTS, 'MODE': 'sync'},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        resolver.invalidate()
+        self.event = Event.objects.create(
+            title='Event', slug='event', description='An event', venue='Main Hall',
+            date=timezone.now() + timedelta(days=1),
+        )
+
+    def run_jobs(self, callbacks):
+        for callback in callbacks:
+            callback()
+
+    def test_full_save_of_a_stale_gallery_image_keeps_its_variants(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            image = EventImage.objects.create(event=self.event, image=upload())
+        stale = EventImage.objects.get(pk=image.pk)
+        self.run_jobs(callbacks)
+
+        stale.caption = 'Stage'
+        stale.save()
+        image.refresh_from_db()
+        self.assertEqual(image.caption, 'Stage')
+        self.assertEqual(set(image.image_variants), {'webp', 'jpeg'})
+
+    def test_full_save_of_a_stale_event_keeps_its_featured_variants(self):
+        stale = Event.objects.get(pk=self.event.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.featured_image = upload()
+            self.event.save()
+
+        stale.title = 'Renamed'
+        stale.save()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.title, 'Renamed')
+        self.assertEqual(set(self.event.featured_image_variants), {'webp', 'jpeg'})
+
+    def test_new_file_replaces_the_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = EventImage.objects.create(event=self.event, image=upload())
+        image = EventImage.objects.get(pk=image.pk)
+        old = [name for names in image.image_variants.values() for name in names.values()]
+        self.assertTrue(old)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image.image = upload('other.jpg', color='blue')
+            image.save()
+
+        image.refresh_from_db()
+        new = [name for names in image.image_variants.values() for name in names.values()]
+        self.assertTrue(new)
+        self.assertTrue(all('other' in name for name in new))
+        self.assertFalse(any(default_storage.exists(name) for name in old))
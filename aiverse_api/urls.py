@@ -1,10 +1,13 @@
 """
 URL configuration for aiverse_api project.
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from .media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -18,10 +21,11 @@ urlpatterns = [
     path('api/analytics/', include('analytics.urls')),
 ]
 
-# Serve media files in development
+# Media is served with validators, ranges and caching (or handed to the front
+# proxy) in every environment; static files only need serving in development
+urlpatterns += [
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+]
+
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-else:
-    # Also serve media in production (for Railway)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
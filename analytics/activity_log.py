@@ -0,0 +1,142 @@
+"""
+Buffered Activity writer.
+
+``log_activity`` queues Activity rows in an in-process buffer once the
+surrounding transaction commits; the buffer is written with a single
+``bulk_create`` when it reaches ``BATCH_SIZE`` rows, after
+``FLUSH_INTERVAL`` seconds, or at interpreter shutdown. With
+``ACTIVITY_LOG['MODE'] = 'sync'`` rows are inserted immediately instead,
+which keeps tests deterministic; inside ``batch()`` those inserts are
+merged into one ``bulk_create`` when the block ends.
+
+``bulk_create`` does not send ``post_save``, so every flush sends
+``activities_flushed`` with the created rows for listeners that care.
+"""
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+activities_flushed = Signal()
+
+
+class ActivityBuffer:
+    """Thread-safe queue of unsaved Activity instances"""
+
+    def __init__(self, batch_size, flush_interval):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, activity):
+        with self._lock:
+            self._pending.append(activity)
+            full = len(self._pending) >= self.batch_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write every queued row; returns the created Activity instances"""
+        from .models import Activity
+
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return []
+
+        try:
+            created = Activity.objects.bulk_create(batch)
+        except Exception:
+            logger.exception('Failed to write %d activity records', len(batch))
+            return []
+
+        activities_flushed.send(sender=Activity, activities=created)
+        return created
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread opened its own connection; don't leak it
+            connection.close()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_batch = threading.local()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                options = settings.ACTIVITY_LOG
+                _buffer = ActivityBuffer(options['BATCH_SIZE'], options['FLUSH_INTERVAL'])
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def log_activity(user, action, activity_type='other'):
+    """Record an Activity for ``user`` without an INSERT in the request path"""
+    from .models import Activity
+
+    pending = getattr(_batch, 'pending', None)
+    if settings.ACTIVITY_LOG['MODE'] == 'sync' and pending is None:
+        return Activity.objects.create(user=user, action=action, activity_type=activity_type)
+
+    activity = Activity(
+        user=user,
+        action=action,
+        activity_type=activity_type,
+        timestamp=timezone.now(),
+    )
+    if settings.ACTIVITY_LOG['MODE'] == 'sync':
+        pending.append(activity)
+    else:
+        # Only queue rows whose transaction actually committed
+        transaction.on_commit(lambda: get_buffer().add(activity))
+    return activity
+
+
+@contextmanager
+def batch():
+    """Insert the activities logged in the block together when it ends (sync mode)"""
+    if getattr(_batch, 'pending', None) is not None:
+        yield
+        return
+
+    from .models import Activity
+
+    _batch.pending = []
+    try:
+        yield
+        pending = _batch.pending
+    finally:
+        _batch.pending = None
+    if pending:
+        created = Activity.objects.bulk_create(pending)
+        transaction.on_commit(lambda: activities_flushed.send(sender=Activity, activities=created))
+
+
+def flush():
+    """Write any buffered activities now"""
+    if _buffer is not None:
+        return _buffer.flush()
+    return []
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Activity
+from .models import Activity, DailyStats, EventDailyStats, StatusCounter
 
 
 @admin.register(Activity)
@@ -9,3 +9,24 @@ class ActivityAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'action']
     ordering = ['-timestamp']
     readonly_fields = ['timestamp']
+
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['date', 'new_users', 'registrations', 'payments_pending', 'payments_approved',
+                    'payments_rejected', 'revenue_approved']
+    ordering = ['-date']
+
+
+@admin.register(EventDailyStats)
+class EventDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['date', 'event', 'registrations', 'payments_pending', 'payments_approved',
+                    'payments_rejected', 'revenue_approved']
+    list_filter = ['event']
+    ordering = ['-date']
+
+
+@admin.register(StatusCounter)
+class StatusCounterAdmin(admin.ModelAdmin):
+    list_display = ['entity', 'status', 'count', 'amount']
+    list_filter = ['entity']
@@ -0,0 +1,299 @@
+"""
+Fan-out of live dashboard events to Server-Sent Event streams.
+
+Each worker keeps a ``Hub`` of subscriber queues. A broker feeds the hub:
+
+* ``LocalBroker`` delivers messages published in this process directly.
+  Enough for a single worker or development.
+* ``DatabaseBroker`` is the cross-worker stand-in for a pub/sub server. One
+  poller per event loop reads new Activity rows and counter changes from
+  the database, so streams see writes made by any worker.
+
+Messages are dicts with ``event``, ``data`` and, for activities, the
+Activity ``id`` used for ``Last-Event-ID`` resume.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def activity_payload(activity):
+    return {
+        'id': activity.id,
+        'user': activity.user.full_name or activity.user.email,
+        'action': activity.action,
+        'type': activity.activity_type,
+        'time': activity.timestamp.isoformat(),
+    }
+
+
+def activity_message(activity):
+    return {'event': 'activity', 'id': activity.id, 'data': activity_payload(activity)}
+
+
+def format_event(message):
+    """Encode a message in the text/event-stream wire format"""
+    lines = []
+    if message.get('id') is not None:
+        lines.append(f"id: {message['id']}")
+    lines.append(f"event: {message['event']}")
+    lines.append(f"data: {json.dumps(message['data'], cls=DjangoJSONEncoder)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def counter_values():
+    """Current counters flattened to ``{'entity:status': {'count', 'amount'}}``"""
+    from . import counters
+
+    return {
+        f'{entity}:{status}': values
+        for entity, statuses in counters.snapshot().items()
+        for status, values in statuses.items()
+    }
+
+
+def activities_after(last_id, limit):
+    from .models import Activity
+
+    activities = Activity.objects.select_related('user').filter(id__gt=last_id).order_by('id')[:limit]
+    return [activity_message(activity) for activity in activities]
+
+
+def changes_after(last_id, limit):
+    """One poll: the activities after ``last_id`` and the current counters"""
+    return activities_after(last_id, limit), counter_values()
+
+
+def latest_activity_id():
+    from .models import Activity
+
+    return Activity.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def detached(func):
+    """``func`` as a coroutine that runs on a pool thread and closes that thread's connections after.
+
+    For work that outlives a request: thread-sensitive calls would queue behind
+    the request's executor, and pool threads would otherwise keep a connection
+    open each.
+    """
+    @functools.wraps(func)
+    def closing(*args):
+        try:
+            return func(*args)
+        finally:
+            connections.close_all()
+
+    return sync_to_async(closing, thread_sensitive=False)
+
+
+class Hub:
+    """Thread-safe set of subscriber queues, each bound to its event loop"""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.add(entry)
+        return entry
+
+    def unsubscribe(self, entry):
+        with self._lock:
+            self._subscribers.discard(entry)
+
+    def has_subscribers(self, loop):
+        with self._lock:
+            return any(subscriber_loop is loop for subscriber_loop, _ in self._subscribers)
+
+    def publish(self, message, loop=None):
+        """Deliver to every subscriber, or only those on ``loop``; callable from any thread"""
+        with self._lock:
+            subscribers = [
+                entry for entry in self._subscribers
+                if loop is None or entry[0] is loop
+            ]
+        for subscriber_loop, queue in subscribers:
+            try:
+                subscriber_loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                # The subscriber's loop has already closed
+                pass
+
+
+class LocalBroker:
+    """Delivers messages published in this process to this process's streams"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, message):
+        self.hub.publish(message)
+
+    def attach(self, loop):
+        pass
+
+
+class DatabaseBroker:
+    """Cross-worker broker backed by polling the database.
+
+    Local publishes are ignored: activities and counters are already
+    persisted, and the poller picks them up for every worker alike.
+    """
+
+    def __init__(self, hub, poll_interval, batch_size):
+        self.hub = hub
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._pollers = {}
+
+    def publish(self, message):
+        pass
+
+    def attach(self, loop):
+        poller = self._pollers.get(loop)
+        if poller is None or poller.done():
+            # A fresh context, so the poller doesn't inherit the first stream's request context
+            self._pollers[loop] = contextvars.Context().run(loop.create_task, self._poll(loop))
+
+    async def _poll(self, loop):
+        try:
+            last_id = await detached(latest_activity_id)()
+            counts = await detached(counter_values)()
+            while self.hub.has_subscribers(loop):
+                await asyncio.sleep(self.poll_interval)
+
+                messages, current = await detached(changes_after)(last_id, self.batch_size)
+                for message in messages:
+                    last_id = message['id']
+                    self.hub.publish(message, loop=loop)
+
+                deltas = counter_deltas(counts, current)
+                if deltas:
+                    self.hub.publish({'event': 'counters', 'data': deltas}, loop=loop)
+                counts = current
+        except Exception:
+            logger.exception('Activity stream poller failed')
+        finally:
+            self._pollers.pop(loop, None)
+
+
+def counter_deltas(before, after):
+    deltas = {}
+    empty = {'count': 0, 'amount': 0}
+    for key in set(before) | set(after):
+        old, new = before.get(key, empty), after.get(key, empty)
+        if old['count'] != new['count'] or old['amount'] != new['amount']:
+            deltas[key] = {
+                'count': new['count'] - old['count'],
+                'amount': new['amount'] - old['amount'],
+            }
+    return deltas
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                options = settings.ACTIVITY_STREAM
+                hub = Hub()
+                if options['BROKER'] == 'database':
+                    _broker = DatabaseBroker(hub, options['POLL_INTERVAL'], options['REPLAY_LIMIT'])
+                else:
+                    _broker = LocalBroker(hub)
+    return _broker
+
+
+def publish_activities(activities):
+    broker = get_broker()
+    for activity in activities:
+        if activity.id is not None:
+            broker.publish(activity_message(activity))
+
+
+def publish_counter_delta(entity, status, count, amount):
+    get_broker().publish({
+        'event': 'counters',
+        'data': {f'{entity}:{status}': {'count': count, 'amount': amount}},
+    })
+
+
+async def event_stream(last_event_id=None, duration=None):
+    """Yield SSE frames: a counters snapshot, any missed activities, then live events.
+
+    ``duration`` bounds the stream in seconds (None streams until the client
+    disconnects); clients reconnect with ``Last-Event-ID`` to resume.
+    """
+    options = settings.ACTIVITY_STREAM
+    broker = get_broker()
+    loop = asyncio.get_running_loop()
+    entry = broker.hub.subscribe()
+    queue = entry[1]
+    broker.attach(loop)
+    try:
+        yield f"retry: {options['RETRY']}\n\n"
+        yield format_event({'event': 'snapshot', 'data': await sync_to_async(counter_values)()})
+
+        last_id = last_event_id
+        if last_id is not None:
+            for message in await sync_to_async(activities_after)(last_id, options['REPLAY_LIMIT']):
+                last_id = message['id']
+                yield format_event(message)
+
+        deadline = loop.time() + duration if duration else None
+        while True:
+            timeout = options['HEARTBEAT']
+            if deadline is not None:
+                timeout = min(timeout, deadline - loop.time())
+                if timeout <= 0:
+                    break
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+
+            message_id = message.get('id')
+            if message_id is not None:
+                # Already sent during replay
+                if last_id is not None and message_id <= last_id:
+                    continue
+                last_id = message_id
+            yield format_event(message)
+    finally:
+        broker.hub.unsubscribe(entry)
+
+
+def poll_frames(last_event_id=None):
+    """The SSE frames available right now, for WSGI servers that can't hold a stream open.
+
+    A retry interval, a counters snapshot whose ``id`` is the resume point and
+    any activities after ``last_event_id``. The browser reconnects after
+    ``RETRY`` milliseconds with ``Last-Event-ID`` and picks up from there.
+    """
+    options = settings.ACTIVITY_STREAM
+    resume_id = last_event_id if last_event_id is not None else latest_activity_id()
+    frames = [
+        f"retry: {options['RETRY']}\n\n",
+        format_event({'event': 'snapshot', 'id': resume_id, 'data': counter_values()}),
+    ]
+    if last_event_id is not None:
+        frames.extend(format_event(message) for message in activities_after(last_event_id, options['REPLAY_LIMIT']))
+    return frames
@@ -0,0 +1,81 @@
+"""
+Response cache for the admin dashboard.
+
+Entries are keyed by a data version that model signals bump on every
+write, so a stale payload is never served and no explicit deletes are
+needed. Values are the rendered JSON bytes. Concurrent misses for the same
+key are coalesced with a short-lived ``cache.add`` lock: one worker
+recomputes while the others wait for its result.
+
+Versions and locks only reach other workers through a shared cache, so
+nothing is cached unless ``settings.DASHBOARD_CACHE`` is on (by default,
+when ``REDIS_URL`` is set).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'analytics:dashboard:version'
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 5
+POLL_INTERVAL = 0.05
+
+
+def data_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted version never reuses old keys
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        data_version()
+
+
+def invalidate():
+    """Bump the data version once the current transaction commits"""
+    # Bumping before commit would let a concurrent miss cache pre-commit data
+    # under the new version
+    transaction.on_commit(_bump)
+
+
+def cache_key(params):
+    digest = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+    return f'analytics:dashboard:v{data_version()}:{digest}'
+
+
+def get_or_compute(params, compute):
+    """Return cached bytes for ``params`` or store the result of ``compute()``"""
+    if not settings.DASHBOARD_CACHE:
+        return compute()
+    
+    key = cache_key(params)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            payload = compute()
+            cache.set(key, payload, settings.DASHBOARD_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return payload
+
+    # Another worker is computing this entry; wait for it before giving up
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+    return compute()
@@ -0,0 +1,139 @@
+"""
+Materialized status counters for the dashboard stats block.
+
+``StatusCounter`` keeps one row per (entity, status) with a row count and,
+for payments, an amount total. Signal handlers adjust the rows inside the
+saving transaction; ``verify`` recounts from the source tables.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from . import broadcast
+from .rollups import apply_deltas
+
+ALL = 'all'
+
+
+def adjust(entity, status, count=0, amount=0, create=True):
+    from .models import StatusCounter
+
+    if status is None:
+        return
+    amount = Decimal(amount or 0)
+    apply_deltas(
+        StatusCounter, {'entity': entity, 'status': status},
+        {'count': count, 'amount': amount}, create,
+    )
+    transaction.on_commit(
+        lambda: broadcast.publish_counter_delta(entity, status, count, amount)
+    )
+
+
+def move(entity, previous, current, sign=1):
+    """Move one row between statuses.
+
+    ``previous`` and ``current`` are ``(status, amount)`` pairs; either may be
+    None for a created or deleted row.
+    """
+    if previous == current:
+        return
+    if previous is not None:
+        adjust(entity, previous[0], -1, -Decimal(previous[1] or 0), create=sign > 0)
+    if current is not None:
+        adjust(entity, current[0], 1, current[1])
+
+
+def record_payment(payment, previous=None, created=False):
+    move('payment', None if created else previous, (payment.status, payment.amount))
+
+
+def record_payment_deleted(payment):
+    move('payment', (payment.status, payment.amount), None, sign=-1)
+
+
+def record_event(event, previous=None, created=False):
+    move('event', None if created else (previous, 0), (event.status, 0))
+
+
+def record_event_deleted(event):
+    move('event', (event.status, 0), None, sign=-1)
+
+
+def record_user(sign=1):
+    adjust('user', ALL, sign, create=sign > 0)
+
+
+def record_registration(sign=1):
+    adjust('registration', ALL, sign, create=sign > 0)
+
+
+def snapshot():
+    """Current counters as ``{entity: {status: {'count': n, 'amount': x}}}`` in one query"""
+    from .models import StatusCounter
+
+    counters = defaultdict(dict)
+    for entity, status, count, amount in StatusCounter.objects.values_list(
+        'entity', 'status', 'count', 'amount'
+    ):
+        counters[entity][status] = {'count': count, 'amount': amount}
+    return counters
+
+
+def recount(apps=None):
+    """Counters recomputed from the source tables, keyed like ``snapshot``"""
+    registry = apps or django_apps
+    User = registry.get_model(settings.AUTH_USER_MODEL)
+    Event = registry.get_model('events', 'Event')
+    EventRegistration = registry.get_model('events', 'EventRegistration')
+    Payment = registry.get_model('payments', 'Payment')
+
+    counters = defaultdict(dict)
+    counters['user'][ALL] = {'count': User.objects.count(), 'amount': Decimal(0)}
+    counters['registration'][ALL] = {'count': EventRegistration.objects.count(), 'amount': Decimal(0)}
+    for status, count in Event.objects.order_by().values_list('status').annotate(n=Count('id')):
+        counters['event'][status] = {'count': count, 'amount': Decimal(0)}
+    for status, count, amount in Payment.objects.order_by().values_list('status').annotate(
+        n=Count('id'), total=Sum('amount')
+    ):
+        counters['payment'][status] = {'count': count, 'amount': amount or Decimal(0)}
+    return counters
+
+
+def verify(fix=False, apps=None):
+    """Compare stored counters with a recount.
+
+    Returns a list of ``(entity, status, stored, actual)`` mismatches. With
+    ``fix=True`` the table is replaced by the recount in one transaction.
+    """
+    registry = apps or django_apps
+    StatusCounter = registry.get_model('analytics', 'StatusCounter')
+
+    stored = defaultdict(dict)
+    for row in StatusCounter.objects.values('entity', 'status', 'count', 'amount'):
+        stored[row['entity']][row['status']] = {'count': row['count'], 'amount': row['amount']}
+    actual = recount(apps)
+
+    empty = {'count': 0, 'amount': Decimal(0)}
+    mismatches = []
+    for entity in sorted(set(stored) | set(actual)):
+        for status in sorted(set(stored[entity]) | set(actual[entity])):
+            have = stored[entity].get(status, empty)
+            want = actual[entity].get(status, empty)
+            if have['count'] != want['count'] or Decimal(have['amount']) != Decimal(want['amount']):
+                mismatches.append((entity, status, have, want))
+
+    if fix and mismatches:
+        with transaction.atomic():
+            StatusCounter.objects.all().delete()
+            StatusCounter.objects.bulk_create(
+                StatusCounter(entity=entity, status=status, **values)
+                for entity, statuses in actual.items()
+                for status, values in statuses.items()
+            )
+
+    return mismatches
@@ -0,0 +1,306 @@
+import gzip
+import json
+import logging
+import statistics
+import time
+from datetime import timedelta
+from itertools import count
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from django.utils import timezone
+
+from aiverse_api.queries import repeated_templates
+from analytics import counters, rollups
+from analytics.models import Activity
+from events import capacity, resolver
+from events.models import Event, EventImage, EventRegistration
+from payments.models import Payment
+
+User = get_user_model()
+
+BUDGETS_PATH = Path(__file__).resolve().parents[2] / 'benchmark_budgets.json'
+
+# A SQL shape repeated more often than this within one request is an N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database and benchmark the main API endpoints '
+        'against the checked-in query-count budgets'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Users to seed at scale 1')
+        parser.add_argument('--iterations', type=int, default=20, help='Measured requests per endpoint')
+        parser.add_argument('--scale-factor', type=int, default=10,
+                            help='Re-run at this multiple of the dataset and compare (0 to skip)')
+        parser.add_argument('--max-growth', type=float, default=3.0,
+                            help='Median latency growth between scale 1 and the scaled run to warn about')
+        parser.add_argument('--budgets', default=str(BUDGETS_PATH), help='Budgets JSON file')
+        parser.add_argument('--update-budgets', action='store_true',
+                            help='Write the measured scale-1 results as the new budgets')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        # The dashboard logs every access; keep it out of the report
+        logging.disable(logging.INFO)
+        try:
+            # Write activities inline so every request's queries are counted deterministically;
+            # this is one process, so the dashboard cache is coherent without Redis
+            with override_settings(
+                ACTIVITY_LOG={'MODE': 'sync', 'BATCH_SIZE': 1, 'FLUSH_INTERVAL': 1}, DASHBOARD_CACHE=True,
+            ):
+                failures = self.run_benchmarks(options)
+        finally:
+            logging.disable(logging.NOTSET)
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} benchmark budget(s) exceeded')
+        self.stdout.write(self.style.SUCCESS('All endpoints within budget'))
+
+    def run_benchmarks(self, options):
+        users = options['users']
+        self.seed(users)
+        baseline = self.measure_all(options['iterations'])
+        self.report(f'scale 1 ({users} users)', baseline)
+
+        budgets_path = Path(options['budgets'])
+        if options['update_budgets']:
+            self.write_budgets(budgets_path, users, baseline)
+            return []
+
+        if not budgets_path.exists():
+            raise CommandError(f'No budgets at {budgets_path}; run with --update-budgets first')
+        budgets = json.loads(budgets_path.read_text())['endpoints']
+        failures = self.check_budgets(budgets, baseline)
+
+        factor = options['scale_factor']
+        if factor > 1:
+            self.seed(users * factor)
+            scaled = self.measure_all(options['iterations'])
+            self.report(f'scale {factor} ({users * factor} users)', scaled)
+            failures += self.check_scaling(budgets, baseline, scaled, options['max_growth'])
+
+        return failures
+
+    # Dataset
+
+    def seed(self, users):
+        for model in (Activity, Payment, EventRegistration, EventImage, Event, User):
+            model.objects.all().delete()
+        cache.clear()
+
+        now = timezone.now()
+        password = make_password('benchmark-password')
+        User.objects.bulk_create(
+            User(
+                email=f'user{i}@example.com', username=f'user{i}', full_name=f'User {i}',
+                phone=f'98{i:08d}', college='Benchmark College', password=password,
+            )
+            for i in range(users)
+        )
+
+        event_count = max(5, users // 100)
+        Event.objects.bulk_create(
+            Event(
+                title=f'Event {i}', slug='ai-verse-4' if i == 0 else f'event-{i}',
+                description='Benchmark event ' * 50, short_description='Benchmark event',
+                date=now + timedelta(days=i - event_count // 2), venue='Main Hall',
+                registration_fee=100 if i % 2 == 0 else 0,
+                status='upcoming' if i >= event_count // 2 else 'completed',
+            )
+            for i in range(event_count)
+        )
+        events = list(Event.objects.all())
+        EventImage.objects.bulk_create(
+            EventImage(event=event, image=f'event_gallery/benchmark-{event.id}-{n}.jpg')
+            for event in events for n in range(3)
+        )
+
+        user_ids = list(User.objects.values_list('id', flat=True))
+        registrations = [
+            EventRegistration(user_id=user_id, event=events[n % len(events)])
+            for n, user_id in enumerate(user_ids)
+        ]
+        EventRegistration.objects.bulk_create(registrations)
+        Payment.objects.bulk_create(
+            Payment(
+                user_id=registration.user_id, event=registration.event,
+                amount=registration.event.registration_fee,
+                status=('pending', 'approved', 'rejected')[n % 3],
+                transaction_id=f'TXN{n}',
+            )
+            for n, registration in enumerate(registrations)
+            if registration.event.registration_fee > 0
+        )
+        Activity.objects.bulk_create(
+            Activity(user_id=user_id, action='registered', activity_type='registration')
+            for user_id in user_ids
+        )
+
+        # bulk_create skips the signals that maintain the derived tables
+        rollups.rebuild()
+        counters.verify(fix=True)
+        capacity.reconcile(fix=True)
+        resolver.invalidate()
+
+    # Measurement
+
+    def endpoints(self):
+        event = Event.objects.get(slug='ai-verse-4')
+        emails = (f'new{n}@example.com' for n in count())
+        payer = User.objects.order_by('id').first()
+        pending = iter(Payment.objects.filter(status='pending').values_list('id', flat=True))
+        events_etag = Client().get('/api/events/')['ETag']
+
+        def clear_cache():
+            cache.clear()
+
+        return [
+            ('events-list', lambda c: c.get('/api/events/'), None),
+            ('events-list-gzip', lambda c: c.get('/api/events/', HTTP_ACCEPT_ENCODING='gzip'), None),
+            ('events-list-sparse', lambda c: c.get('/api/events/?fields=id,slug,title,date'), None),
+            ('events-list-not-modified', lambda c: c.get('/api/events/', HTTP_IF_NONE_MATCH=events_etag), None),
+            ('event-detail', lambda c: c.get(f'/api/events/{event.slug}/'), None),
+            ('events-search', lambda c: c.get('/api/events/search/?q=bench'), None),
+            ('events-timeline', lambda c: c.get('/api/events/timeline/'), clear_cache),
+            ('events-timeline-cached', lambda c: c.get('/api/events/timeline/'), None),
+            ('registration-create', lambda c: c.post(
+                '/api/registrations/',
+                {'email': next(emails), 'fullName': 'New User', 'phone': '9000000000'},
+                content_type='application/json',
+            ), None),
+            ('payment-create', lambda c: c.post(
+                '/api/payments/',
+                {'email': payer.email, 'amount': '100.00', 'transaction_id': 'BENCH'},
+                content_type='application/json',
+            ), None),
+            ('payment-approve', lambda c: c.post(f'/api/payments/{next(pending)}/approve/'), None),
+            ('dashboard', lambda c: c.get('/api/analytics/'), clear_cache),
+            ('dashboard-cached', lambda c: c.get('/api/analytics/'), None),
+            ('admin-users', lambda c: c.get('/api/users/'), None),
+            ('admin-users-search', lambda c: c.get('/api/users/?search=user1'), None),
+            ('users-autocomplete', lambda c: c.get('/api/users/autocomplete/?q=user12'), None),
+        ]
+
+    def measure_all(self, iterations):
+        client = Client()
+        results = {}
+        for name, request, before_each in self.endpoints():
+            timings, queries, rows, repeated = [], 0, 0, {}
+            # One unmeasured warm-up request
+            for iteration in range(iterations + 1):
+                if before_each:
+                    before_each()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = request(client)
+                    elapsed = (time.perf_counter() - started) * 1000
+
+                if response.status_code >= 400:
+                    raise CommandError(f'{name} returned {response.status_code}: {response.content[:200]!r}')
+                if iteration == 0:
+                    continue
+
+                timings.append(elapsed)
+                statements = [query['sql'] for query in captured.captured_queries]
+                queries = max(queries, len(statements))
+                rows = max(rows, self.rows_serialized(response))
+                repeated.update(repeated_templates(statements, N_PLUS_ONE_THRESHOLD))
+
+            results[name] = {
+                'p50_ms': statistics.median(timings),
+                'queries': queries,
+                'rows': rows,
+                'repeated': repeated,
+            }
+        return results
+
+    @staticmethod
+    def rows_serialized(response):
+        content = response.content
+        if response.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return 0
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            return len(data['results'])
+        if isinstance(data, list):
+            return len(data)
+        return 1
+
+    # Reporting and budgets
+
+    def report(self, label, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Benchmark at {label}'))
+        self.stdout.write(f"{'endpoint':<26}{'p50 ms':>9}{'queries':>9}{'rows':>7}")
+        for name, result in results.items():
+            self.stdout.write(f"{name:<26}{result['p50_ms']:>9.1f}{result['queries']:>9}{result['rows']:>7}")
+
+    def write_budgets(self, path, users, results):
+        budgets = {
+            'users': users,
+            'endpoints': {
+                name: {
+                    'queries': result['queries'],
+                    # Known N+1s are recorded so they can't spread unnoticed
+                    'n_plus_one_allowed': bool(result['repeated']),
+                }
+                for name, result in results.items()
+            },
+        }
+        path.write_text(json.dumps(budgets, indent=2) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Wrote budgets to {path}'))
+
+    def check_budgets(self, budgets, results):
+        """Query counts and N+1s only: timings vary too much between runs and machines to gate on"""
+        failures = []
+        for name, result in results.items():
+            budget = budgets.get(name)
+            if budget is None:
+                failures.append(f'{name}: no budget recorded')
+                continue
+            if result['queries'] > budget['queries']:
+                failures.append(f"{name}: {result['queries']} queries, budget {budget['queries']}")
+            if budget.get('n_plus_one_allowed'):
+                continue
+            for template, repeats in result['repeated'].items():
+                failures.append(f'{name}: likely N+1, {repeats}x {template[:120]}')
+        return failures
+
+    def check_scaling(self, budgets, baseline, scaled, max_growth):
+        failures = []
+        for name, result in scaled.items():
+            base = baseline[name]
+            if budgets.get(name, {}).get('n_plus_one_allowed'):
+                continue
+            if result['queries'] > base['queries']:
+                failures.append(
+                    f"{name}: query count grows with data ({base['queries']} -> {result['queries']})"
+                )
+            # Latency only warns; compare per serialized row so larger pages aren't a regression
+            base_cost = max(base['p50_ms'], 1.0) / max(base['rows'], 1)
+            scaled_cost = result['p50_ms'] / max(result['rows'], 1)
+            if scaled_cost > base_cost * max_growth:
+                self.stderr.write(self.style.WARNING(
+                    f"{name}: median latency grows with data ({base['p50_ms']:.1f} -> {result['p50_ms']:.1f} ms)"
+                ))
+        return failures
@@ -0,0 +1,151 @@
+import io
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from aiverse_api.fastjson import FastJSONParser, FastJSONRenderer, encoder_name
+
+
+def srcset(path):
+    base = f'http://testserver/media/{path}'
+    return {
+        'original': f'{base}.3f2a1c18b2d4.jpg',
+        'webp': {str(width): f'{base}__w{width}.8a1e07c4f3b9.webp' for width in (320, 640, 1280)},
+        'jpeg': {str(width): f'{base}__w{width}.9b2d55e0a7c1.jpg' for width in (320, 640, 1280)},
+    }
+
+
+def payment_rows(count, raw):
+    """Payment list rows as PaymentSerializer renders them (``raw`` keeps Decimal/datetime values)"""
+    now = timezone.now()
+    rows = []
+    for n in range(count):
+        submitted = now - timedelta(minutes=37 * n, microseconds=n)
+        amount = Decimal('499.00') + n % 7
+        rows.append({
+            'id': n + 1,
+            'user': 1000 + n,
+            'user_email': f'student{n}@college.edu',
+            'user_name': f'Student Number {n}',
+            'user_phone': f'98765{n:05d}',
+            'event': 3,
+            'event_title': 'AIVerse 2.0 — Hackathon & Summit',
+            'amount': amount if raw else str(amount),
+            'transaction_id': f'UPI{n:012d}',
+            'payment_screenshot': f'http://testserver/media/payment_screenshots/proof_{n}.jpg',
+            'payment_screenshot_url': f'http://testserver/media/payment_screenshots/proof_{n}.jpg',
+            'payment_screenshot_srcset': srcset(f'payment_screenshots/variants/proof_{n}'),
+            'status': ('pending', 'approved', 'rejected')[n % 3],
+            'notes': '',
+            'submitted_at': submitted if raw else submitted.isoformat().replace('+00:00', 'Z'),
+            'processed_at': None,
+            'processed_by': None,
+            'processed_by_email': None,
+        })
+    return {'next': 'http://testserver/api/payments/?cursor=cD0yMDI2', 'previous': None, 'results': rows}
+
+
+def event_rows(count, raw):
+    """Event list rows as EventSerializer renders them (``raw`` keeps Decimal/datetime values)"""
+    now = timezone.now()
+    rows = []
+    for n in range(count):
+        date = now + timedelta(days=n)
+        fee = Decimal('1499.50') + n
+        updated = now - timedelta(hours=n)
+        rows.append({
+            'id': n + 1,
+            'title': f'AIVerse Workshop {n}: Diffusion models in practice',
+            'slug': f'aiverse-workshop-{n}',
+            'description': 'A hands-on day of talks and labs. ' * 20,
+            'short_description': 'Talks, labs and a hackathon on generative AI.',
+            'date': date if raw else date.isoformat().replace('+00:00', 'Z'),
+            'end_date': None,
+            'venue': 'Main Auditorium, Block C',
+            'registration_fee': fee if raw else str(fee),
+            'max_participants': 300,
+            'status': 'upcoming',
+            'highlights': ['Keynotes', 'Hands-on labs', 'Hackathon', 'Networking'],
+            'gallery_dir': f'workshop-{n}',
+            'cover_image_name': 'cover.jpg',
+            'cover_image_url': f'/gallery/workshop-{n}/cover.jpg',
+            'featured_image': f'http://testserver/media/event_images/event_{n}.jpg',
+            'featured_image_url': f'http://testserver/media/event_images/event_{n}.jpg',
+            'featured_image_srcset': srcset(f'event_images/variants/event_{n}'),
+            'is_featured': n % 5 == 0,
+            'images': [
+                {
+                    'id': n * 10 + i,
+                    'image': f'http://testserver/media/event_gallery/{n}_{i}.jpg',
+                    'image_url': f'http://testserver/media/event_gallery/{n}_{i}.jpg',
+                    'image_srcset': srcset(f'event_gallery/variants/{n}_{i}'),
+                    'caption': f'Day {i + 1}',
+                    'uploaded_at': updated if raw else updated.isoformat().replace('+00:00', 'Z'),
+                }
+                for i in range(3)
+            ],
+            'total_registrations': 120 + n,
+            'is_full': False,
+            'created_at': updated if raw else updated.isoformat().replace('+00:00', 'Z'),
+            'updated_at': updated if raw else updated.isoformat().replace('+00:00', 'Z'),
+        })
+    return {'next': None, 'previous': None, 'results': rows}
+
+
+def timed(func, iterations):
+    """Median milliseconds per call"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare DRF\'s JSONRenderer/JSONParser with aiverse_api.fastjson on payment and '
+        'event list payloads, checking that both render identical bytes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200, help='Rows per payload')
+        parser.add_argument('--iterations', type=int, default=50, help='Timed runs per case')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        iterations = options['iterations']
+        self.stdout.write(f'Encoder: {encoder_name()}; {rows} rows, median of {iterations} runs')
+
+        payloads = [
+            ('payments', payment_rows(rows, raw=False)),
+            ('payments (Decimal/datetime)', payment_rows(rows, raw=True)),
+            ('events', event_rows(rows, raw=False)),
+            ('events (Decimal/datetime)', event_rows(rows, raw=True)),
+        ]
+        renderers = (JSONRenderer(), FastJSONRenderer())
+        parsers = (JSONParser(), FastJSONParser())
+
+        self.stdout.write(f'{"payload":<30} {"KiB":>6} {"render ms":>18} {"parse ms":>18}')
+        for label, data in payloads:
+            rendered = [renderer.render(data) for renderer in renderers]
+            if rendered[0] != rendered[1]:
+                raise CommandError(f'{label}: FastJSONRenderer output differs from JSONRenderer')
+            body = rendered[0]
+            if parsers[0].parse(io.BytesIO(body)) != parsers[1].parse(io.BytesIO(body)):
+                raise CommandError(f'{label}: FastJSONParser result differs from JSONParser')
+
+            render_ms = [timed(lambda: renderer.render(data), iterations) for renderer in renderers]
+            parse_ms = [timed(lambda: parser.parse(io.BytesIO(body)), iterations) for parser in parsers]
+            self.stdout.write(
+                f'{label:<30} {len(body) / 1024:>6.0f} '
+                f'{render_ms[0]:>6.2f} -> {render_ms[1]:>5.2f} ({render_ms[0] / render_ms[1]:>4.1f}x) '
+                f'{parse_ms[0]:>6.2f} -> {parse_ms[1]:>5.2f} ({parse_ms[0] / parse_ms[1]:>4.1f}x)'
+            )
+        self.stdout.write(self.style.SUCCESS('Output identical for every payload'))
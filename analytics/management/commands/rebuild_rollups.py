@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from analytics import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily dashboard rollups from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', help='Last day to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for name in ('start', 'end'):
+            value = options[name]
+            if value:
+                bounds[name] = parse_date(value)
+                if bounds[name] is None:
+                    raise CommandError(f"Invalid date '{value}'")
+
+        days = rollups.rebuild(**bounds)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {days} day(s)'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from aiverse_api.search import registry
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the full-text search indexes from their tables '
+        '(after restoring data with the triggers disabled or missing)'
+    )
+
+    def handle(self, *args, **options):
+        for index in registry:
+            backend = index.backend(connection)
+            if backend is None:
+                self.stdout.write(self.style.WARNING(f'{index.table}: no full-text index on this database'))
+                continue
+            with transaction.atomic():
+                index.rebuild()
+            self.stdout.write(f'{index.table}: rebuilt ({backend})')
+        self.stdout.write(self.style.SUCCESS('Search indexes rebuilt'))
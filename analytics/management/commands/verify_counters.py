@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from analytics import counters
+
+
+class Command(BaseCommand):
+    help = 'Recount payment/event/user status totals and compare them with the stored counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite the counters with the recount')
+
+    def handle(self, *args, **options):
+        mismatches = counters.verify(fix=options['fix'])
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Counters match the source tables'))
+            return
+
+        for entity, status, stored, actual in mismatches:
+            self.stdout.write(self.style.WARNING(
+                f"{entity}:{status} stored count={stored['count']} amount={stored['amount']}, "
+                f"actual count={actual['count']} amount={actual['amount']}"
+            ))
+
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(mismatches)} counter(s)'))
+        else:
+            raise CommandError(f'{len(mismatches)} counter(s) out of sync; rerun with --fix to repair')
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    from analytics.rollups import rebuild
+    rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_initial'),
+        ('payments', '0002_initial'),
+        ('users', '0002_user_department_user_year_of_study'),
+        ('analytics', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registrations', models.IntegerField(default=0)),
+                ('payments_pending', models.IntegerField(default=0)),
+                ('payments_approved', models.IntegerField(default=0)),
+                ('payments_rejected', models.IntegerField(default=0)),
+                ('revenue_pending', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue_approved', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('date', models.DateField(unique=True)),
+                ('new_users', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily stats',
+                'verbose_name_plural': 'Daily stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registrations', models.IntegerField(default=0)),
+                ('payments_pending', models.IntegerField(default=0)),
+                ('payments_approved', models.IntegerField(default=0)),
+                ('payments_rejected', models.IntegerField(default=0)),
+                ('revenue_pending', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue_approved', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('date', models.DateField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='events.event')),
+            ],
+            options={
+                'verbose_name': 'Event daily stats',
+                'verbose_name_plural': 'Event daily stats',
+                'ordering': ['-date'],
+                'unique_together': {('date', 'event')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
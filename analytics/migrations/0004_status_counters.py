@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:00
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    from analytics.counters import verify
+    verify(fix=True, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'ordering': ['entity', 'status'],
+                'unique_together': {('entity', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_status_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activity',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_activity_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['-timestamp', '-id'], name='activity_timestamp_idx'),
+        ),
+    ]
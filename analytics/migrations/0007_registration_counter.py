@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:30
+
+from django.db import migrations
+
+
+def backfill_counters(apps, schema_editor):
+    from analytics.counters import verify
+    verify(fix=True, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_activity_indexes'),
+        ('events', '0008_search_triggers'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
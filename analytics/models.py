@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -17,12 +18,74 @@ class Activity(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     action = models.CharField(max_length=255)
     activity_type = models.CharField(max_length=20, choices=ACTIVITY_TYPE_CHOICES, default='other')
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the activity happens, not when a buffered batch is written
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         ordering = ['-timestamp']
         verbose_name = 'Activity'
         verbose_name_plural = 'Activities'
+        indexes = [
+            # Dashboard recent activity and the cursor-paginated feed
+            models.Index(fields=['-timestamp', '-id'], name='activity_timestamp_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.action}"
+
+
+class RollupCounters(models.Model):
+    """Payment and registration counters shared by the rollup tables"""
+    registrations = models.IntegerField(default=0)
+    payments_pending = models.IntegerField(default=0)
+    payments_approved = models.IntegerField(default=0)
+    payments_rejected = models.IntegerField(default=0)
+    revenue_pending = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue_approved = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        abstract = True
+
+
+class DailyStats(RollupCounters):
+    """Site-wide dashboard metrics rolled up per day"""
+    date = models.DateField(unique=True)
+    new_users = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Daily stats'
+        verbose_name_plural = 'Daily stats'
+    
+    def __str__(self):
+        return f"{self.date}"
+
+
+class EventDailyStats(RollupCounters):
+    """Per-event dashboard metrics rolled up per day"""
+    date = models.DateField()
+    event = models.ForeignKey('events.Event', on_delete=models.CASCADE, related_name='daily_stats')
+    
+    class Meta:
+        unique_together = ['date', 'event']
+        ordering = ['-date']
+        verbose_name = 'Event daily stats'
+        verbose_name_plural = 'Event daily stats'
+    
+    def __str__(self):
+        return f"{self.event_id} - {self.date}"
+
+
+class StatusCounter(models.Model):
+    """Materialized row count and amount total per (entity, status)"""
+    entity = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ['entity', 'status']
+        ordering = ['entity', 'status']
+    
+    def __str__(self):
+        return f"{self.entity}:{self.status} = {self.count}"
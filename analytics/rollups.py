@@ -0,0 +1,265 @@
+"""
+Incrementally maintained daily rollups for the dashboard.
+
+Signal handlers call the ``record_*`` helpers, which apply atomic ``F()``
+increments to ``DailyStats`` / ``EventDailyStats``. Inside ``batch()`` the
+increments (the status counters' too) are merged and written on exit with
+one UPDATE per table. ``rebuild`` recomputes the tables from the source
+rows for backfill and drift repair.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+PAYMENT_STATUSES = ('pending', 'approved', 'rejected')
+REVENUE_STATUSES = ('pending', 'approved')
+
+_batch = threading.local()
+
+
+def _day(value):
+    return timezone.localdate(value) if value else timezone.localdate()
+
+
+def apply_deltas(model, keys, deltas, create=True):
+    """Add ``deltas`` to the row identified by ``keys``, creating it if needed"""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    pending = getattr(_batch, 'pending', None)
+    if pending is not None:
+        row = pending.setdefault(model, {}).setdefault(tuple(sorted(keys.items())), [{}, False])
+        for field, value in deltas.items():
+            row[0][field] = row[0].get(field, 0) + value
+        row[1] = row[1] or create
+        return
+
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**keys).update(**updates) or not create:
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+    except IntegrityError:
+        # Another request created the row first
+        model.objects.filter(**keys).update(**updates)
+
+
+def apply_rows(model, rows):
+    """Apply ``{keys: (deltas, create)}`` to ``model`` with one UPDATE, creating missing rows"""
+    rows = {keys: (deltas, create) for keys, (deltas, create) in rows.items() if any(deltas.values())}
+    if len(rows) < 2:
+        for keys, (deltas, create) in rows.items():
+            apply_deltas(model, dict(keys), deltas, create)
+        return
+
+    conditions = {keys: Q(**dict(keys)) for keys in rows}
+    fields = {field for deltas, _ in rows.values() for field, value in deltas.items() if value}
+    updates = {
+        field: F(field) + Case(
+            *(
+                When(conditions[keys], then=Value(deltas[field]))
+                for keys, (deltas, _) in rows.items() if deltas.get(field)
+            ),
+            default=Value(0),
+            output_field=model._meta.get_field(field),
+        )
+        for field in fields
+    }
+    if model.objects.filter(reduce(or_, conditions.values())).update(**updates) == len(rows):
+        return
+
+    # Rows seen for the first time: create them one by one
+    names = [name for name, _ in next(iter(rows))]
+    existing = set(model.objects.filter(reduce(or_, conditions.values())).values_list(*names))
+    for keys, (deltas, create) in rows.items():
+        if tuple(value for _, value in keys) not in existing and create:
+            apply_deltas(model, dict(keys), deltas)
+
+
+@contextmanager
+def batch():
+    """Merge the rollup and counter increments made in the block; write them on exit.
+
+    Use inside the transaction that makes the changes. Nothing is written if
+    the block raises. Nested blocks join the outer batch.
+    """
+    if getattr(_batch, 'pending', None) is not None:
+        yield
+        return
+
+    _batch.pending = {}
+    try:
+        yield
+        pending = _batch.pending
+    finally:
+        _batch.pending = None
+    for model, rows in pending.items():
+        apply_rows(model, rows)
+
+
+def bump(day, event_id=None, create=True, **deltas):
+    """Apply counter deltas to the site-wide row and, if given, the event row.
+
+    Deletions pass ``create=False``: a cascade from a deleted event must not
+    recreate rollup rows pointing at it.
+    """
+    from .models import DailyStats, EventDailyStats
+
+    apply_deltas(DailyStats, {'date': day}, deltas, create)
+    if event_id:
+        deltas.pop('new_users', None)
+        apply_deltas(EventDailyStats, {'date': day, 'event_id': event_id}, deltas, create)
+
+
+def payment_deltas(status, amount, sign=1):
+    """Counter deltas contributed by a payment in ``status``"""
+    deltas = {}
+    if status in PAYMENT_STATUSES:
+        deltas[f'payments_{status}'] = sign
+    if status in REVENUE_STATUSES:
+        deltas[f'revenue_{status}'] = sign * Decimal(amount or 0)
+    return deltas
+
+
+def record_new_user(user, sign=1):
+    bump(_day(user.created_at), create=sign > 0, new_users=sign)
+
+
+def record_registration(registration, sign=1):
+    bump(
+        _day(registration.registered_at), registration.event_id,
+        create=sign > 0, registrations=sign,
+    )
+
+
+def record_payment(payment, previous=None, sign=1):
+    """Roll up a payment save.
+
+    ``previous`` is the ``(status, amount, event_id, submitted_at)`` the row
+    had before the save, or None for a new payment. Pass ``sign=-1`` to
+    remove a deleted payment.
+    """
+    bucket = (_day(payment.submitted_at), payment.event_id)
+    deltas = payment_deltas(payment.status, payment.amount, sign)
+    if previous is not None:
+        status, amount, event_id, submitted_at = previous
+        removed = payment_deltas(status, amount, sign=-1)
+        previous_bucket = (_day(submitted_at), event_id)
+        if previous_bucket != bucket:
+            # Moved to another event or day: take it out of the old rows
+            bump(*previous_bucket, create=False, **removed)
+            removed = {}
+        for field, value in removed.items():
+            deltas[field] = deltas.get(field, 0) + value
+    bump(*bucket, create=sign > 0, **deltas)
+
+
+def rebuild(start=None, end=None, apps=None):
+    """Recompute rollup rows for [start, end] (inclusive dates) from source tables.
+
+    With no bounds every row is rebuilt. ``apps`` lets migrations pass their
+    historical app registry. Returns the number of daily rows written.
+    """
+    registry = apps or django_apps
+    User = registry.get_model(settings.AUTH_USER_MODEL)
+    EventRegistration = registry.get_model('events', 'EventRegistration')
+    Payment = registry.get_model('payments', 'Payment')
+    DailyStats = registry.get_model('analytics', 'DailyStats')
+    EventDailyStats = registry.get_model('analytics', 'EventDailyStats')
+
+    tz = timezone.get_current_timezone()
+
+    def grouped(queryset, field, *extra):
+        if start:
+            queryset = queryset.filter(**{f'{field}__date__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{field}__date__lte': end})
+        return (
+            queryset.order_by()
+            .annotate(day=TruncDate(field, tzinfo=tz))
+            .values('day', *extra)
+        )
+
+    daily = defaultdict(lambda: defaultdict(int))
+    per_event = defaultdict(lambda: defaultdict(int))
+
+    for row in grouped(User.objects.all(), 'created_at').annotate(n=Count('id')):
+        daily[row['day']]['new_users'] += row['n']
+
+    registrations = grouped(EventRegistration.objects.all(), 'registered_at', 'event_id')
+    for row in registrations.annotate(n=Count('id')):
+        daily[row['day']]['registrations'] += row['n']
+        per_event[(row['day'], row['event_id'])]['registrations'] += row['n']
+
+    payments = grouped(Payment.objects.all(), 'submitted_at', 'event_id', 'status')
+    for row in payments.annotate(n=Count('id'), total=Sum('amount')):
+        for field, value in payment_deltas(row['status'], row['total']).items():
+            value = row['n'] if field.startswith('payments_') else value
+            daily[row['day']][field] += value
+            if row['event_id']:
+                per_event[(row['day'], row['event_id'])][field] += value
+
+    with transaction.atomic():
+        for model in (DailyStats, EventDailyStats):
+            stale = model.objects.all()
+            if start:
+                stale = stale.filter(date__gte=start)
+            if end:
+                stale = stale.filter(date__lte=end)
+            stale.delete()
+
+        DailyStats.objects.bulk_create(
+            DailyStats(date=day, **counters) for day, counters in daily.items()
+        )
+        EventDailyStats.objects.bulk_create(
+            EventDailyStats(date=day, event_id=event_id, **counters)
+            for (day, event_id), counters in per_event.items()
+        )
+
+    return len(daily)
+
+
+def totals():
+    """All-time totals summed over the site-wide rollup rows"""
+    from .models import DailyStats
+
+    fields = ['new_users', 'registrations', 'revenue_pending', 'revenue_approved']
+    fields += [f'payments_{status}' for status in PAYMENT_STATUSES]
+    result = DailyStats.objects.aggregate(**{field: Sum(field) for field in fields})
+    return {field: value or 0 for field, value in result.items()}
+
+
+def series(window, field='new_users'):
+    """Rollup-backed equivalent of ``timeseries.time_series`` for day/week windows"""
+    from .models import DailyStats
+
+    rows = DailyStats.objects.filter(
+        date__gte=window.start.date(),
+        date__lte=window.end.date(),
+    ).values_list('date', field)
+
+    values = defaultdict(int)
+    for day, value in rows:
+        bucket = day
+        if window.granularity == 'week':
+            bucket = day - timedelta(days=day.weekday())
+        values[bucket] += value
+
+    return [
+        {'date': window.label(bucket), 'count': values.get(bucket.date(), 0)}
+        for bucket in window.buckets()
+    ]
@@ -0,0 +1,13 @@
+from rest_framework import serializers
+from .models import Activity
+
+
+class ActivitySerializer(serializers.ModelSerializer):
+    """Serializer for the activity feed"""
+    user_email = serializers.EmailField(source='user.email', read_only=True)
+    user_name = serializers.CharField(source='user.full_name', read_only=True)
+    
+    class Meta:
+        model = Activity
+        fields = ['id', 'user', 'user_email', 'user_name', 'action', 'activity_type', 'timestamp']
+        read_only_fields = fields
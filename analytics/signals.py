@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from events.models import Event
+from payments.models import Payment
+from . import cache as dashboard_cache
+from . import broadcast, counters, rollups
+from .activity_log import activities_flushed
+from .models import Activity
+
+User = get_user_model()
+
+# The user fields the dashboard shows (activities name their user)
+DASHBOARD_USER_FIELDS = {'full_name', 'email'}
+
+
+def invalidate_dashboard(sender, **kwargs):
+    dashboard_cache.invalidate()
+
+
+@receiver(post_save, sender=User, dispatch_uid='dashboard-save-User')
+def invalidate_dashboard_for_user(sender, created, update_fields=None, **kwargs):
+    # Logins save last_login alone; that shouldn't drop the cached dashboard
+    if created or update_fields is None or not update_fields.isdisjoint(DASHBOARD_USER_FIELDS):
+        dashboard_cache.invalidate()
+
+
+for model in (Event, Payment, Activity):
+    post_save.connect(invalidate_dashboard, sender=model, dispatch_uid=f'dashboard-save-{model.__name__}')
+for model in (User, Event, Payment, Activity):
+    post_delete.connect(invalidate_dashboard, sender=model, dispatch_uid=f'dashboard-delete-{model.__name__}')
+
+# Buffered activity writes use bulk_create, which sends no post_save
+activities_flushed.connect(invalidate_dashboard, dispatch_uid='dashboard-activities-flushed')
+
+
+@receiver(activities_flushed)
+def broadcast_flushed_activities(sender, activities, **kwargs):
+    broadcast.publish_activities(activities)
+
+
+@receiver(post_save, sender=Activity)
+def broadcast_activity(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        transaction.on_commit(lambda: broadcast.publish_activities([instance]))
+
+
+@receiver(post_save, sender=User)
+def user_post_save(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        rollups.record_new_user(instance)
+        counters.record_user()
+
+
+@receiver(post_delete, sender=User)
+def user_post_delete(sender, instance, **kwargs):
+    rollups.record_new_user(instance, sign=-1)
+    counters.record_user(sign=-1)
@@ -0,0 +1,230 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from events.models import Event, EventRegistration
+from payments.models import Payment
+
+from . import counters, rollups
+from .models import Activity, DailyStats, EventDailyStats
+
+User = get_user_model()
+
+
+def hot_querysets():
+    """``(label, queryset, acceptable index names)`` for the hot list and count queries"""
+    now = timezone.now()
+    return [
+        ('payments by status', Payment.objects.filter(status='approved').order_by('-submitted_at', '-id')[:50],
+         ['payment_status_submitted_idx']),
+        ('pending payments', Payment.objects.filter(status='pending').order_by('-submitted_at', '-id')[:50],
+         ['payment_pending_idx', 'payment_status_submitted_idx']),
+        ('payments list', Payment.objects.order_by('-submitted_at', '-id')[:50],
+         ['payment_submitted_idx']),
+        ('activity feed', Activity.objects.order_by('-timestamp', '-id')[:50],
+         ['activity_timestamp_idx']),
+        ('users by join date', User.objects.filter(created_at__gte=now - timedelta(days=30), created_at__lt=now),
+         ['user_created_idx']),
+        ('upcoming events', Event.objects.filter(status='upcoming').order_by('date', 'id')[:50],
+         ['event_status_date_idx']),
+        ('active registrations', EventRegistration.objects.filter(event_id=1, is_active=True).values('id'),
+         ['registration_event_active_idx']),
+        ('registrations list', EventRegistration.objects.order_by('-registered_at', '-id')[:50],
+         ['registration_registered_idx']),
+    ]
+
+
+class QueryPlanTests(TestCase):
+    """The hot list/count querysets keep using their indexes (SQLite and PostgreSQL)"""
+
+    def test_hot_querysets_use_their_indexes(self):
+        if connection.vendor == 'postgresql':
+            # Tables are empty here, where a sequential scan is always cheapest;
+            # make the planner show the index it would use at scale. Rolled back
+            # with the test's transaction.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        for label, queryset, indexes in hot_querysets():
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertTrue(
+                    any(name in plan for name in indexes),
+                    f"{label}: expected one of {', '.join(indexes)} in\n{plan}",
+                )
+
+
+class CounterTests(TestCase):
+    """StatusCounter rows follow creates, status changes and deletes, deferred fields included"""
+
+    def setUp(self):
+        self.user = User.objects.create(email='payer@example.com', username='payer', full_name='Payer')
+        self.event = Event.objects.create(
+            title='Event', slug='event', description='An event', venue='Main Hall',
+            date=timezone.now() + timedelta(days=7), registration_fee=0,
+        )
+
+    def counter(self, entity, status):
+        values = counters.snapshot()[entity].get(status, {'count': 0, 'amount': 0})
+        return values['count'], Decimal(values['amount'])
+
+    def pay(self, amount='100.00', **fields):
+        return Payment.objects.create(user=self.user, event=self.event, amount=Decimal(amount), **fields)
+
+    def assertInSync(self):
+        self.assertEqual(counters.verify(), [])
+
+    def test_payment_status_change_moves_count_and_amount(self):
+        payment = self.pay()
+        self.assertEqual(self.counter('payment', 'pending'), (1, Decimal('100.00')))
+
+        payment.status = 'approved'
+        payment.save()
+        self.assertEqual(self.counter('payment', 'pending'), (0, Decimal('0')))
+        self.assertEqual(self.counter('payment', 'approved'), (1, Decimal('100.00')))
+        self.assertInSync()
+
+    def test_amount_change_moves_the_amount(self):
+        payment = self.pay()
+        payment.amount = Decimal('250.00')
+        payment.save()
+        self.assertEqual(self.counter('payment', 'pending'), (1, Decimal('250.00')))
+        self.assertInSync()
+
+    def test_deferred_status_change_reads_the_stored_status(self):
+        payment = self.pay(status='rejected')
+        deferred = Payment.objects.only('id').get(pk=payment.pk)
+        deferred.status = 'approved'
+        deferred.save(update_fields=['status'])
+        self.assertEqual(self.counter('payment', 'rejected'), (0, Decimal('0')))
+        self.assertEqual(self.counter('payment', 'approved'), (1, Decimal('100.00')))
+        self.assertInSync()
+
+    def test_deferred_save_of_other_fields_moves_nothing(self):
+        payment = self.pay()
+        deferred = Payment.objects.only('id', 'notes').get(pk=payment.pk)
+        deferred.notes = 'Checked'
+        deferred.save()
+        self.assertEqual(self.counter('payment', 'pending'), (1, Decimal('100.00')))
+        self.assertInSync()
+
+    def test_repeated_saves_do_not_count_twice(self):
+        payment = self.pay()
+        payment.status = 'approved'
+        payment.save()
+        payment.save()
+        self.assertEqual(self.counter('payment', 'approved'), (1, Decimal('100.00')))
+        self.assertInSync()
+
+    def test_payment_delete_removes_it_from_its_status(self):
+        self.pay(status='approved').delete()
+        self.assertEqual(self.counter('payment', 'approved'), (0, Decimal('0')))
+        self.assertInSync()
+
+    def test_event_status_transitions(self):
+        self.assertEqual(self.counter('event', 'upcoming')[0], 1)
+        deferred = Event.objects.only('id').get(pk=self.event.pk)
+        deferred.status = 'ongoing'
+        deferred.save(update_fields=['status'])
+        self.assertEqual(self.counter('event', 'upcoming')[0], 0)
+        self.assertEqual(self.counter('event', 'ongoing')[0], 1)
+
+        self.event.refresh_from_db()
+        self.event.delete()
+        self.assertEqual(self.counter('event', 'ongoing')[0], 0)
+        self.assertInSync()
+
+    def test_users_and_registrations_are_counted(self):
+        self.assertEqual(self.counter('user', counters.ALL)[0], 1)
+        registration = EventRegistration.objects.create(user=self.user, event=self.event)
+        self.assertEqual(self.counter('registration', counters.ALL)[0], 1)
+        registration.delete()
+        self.assertEqual(self.counter('registration', counters.ALL)[0], 0)
+        self.assertInSync()
+
+
+class RollupTests(TestCase):
+    """Daily rollups follow payments across events and days and match a rebuild"""
+
+    def setUp(self):
+        self.user = User.objects.create(email='payer@example.com', username='payer', full_name='Payer')
+        self.events = [
+            Event.objects.create(
+                title=f'Event {n}', slug=f'event-{n}', description='An event', venue='Main Hall',
+                date=timezone.now() + timedelta(days=7),
+            )
+            for n in range(2)
+        ]
+        self.payment = Payment.objects.create(user=self.user, event=self.events[0], amount=Decimal('100.00'))
+
+    def event_row(self, event, day=None):
+        day = day or timezone.localdate(self.payment.submitted_at)
+        row = EventDailyStats.objects.filter(event=event, date=day).values(
+            'payments_pending', 'payments_approved', 'revenue_pending', 'revenue_approved',
+        ).first()
+        return row and {field: value for field, value in row.items() if value}
+
+    def stored(self):
+        """Non-zero counters of every rollup row, as a rebuild would write them"""
+        rows = {}
+        for model, key in ((DailyStats, ('date',)), (EventDailyStats, ('date', 'event_id'))):
+            for row in model.objects.values():
+                row.pop('id')
+                identity = (model.__name__, *(row.pop(name) for name in key))
+                rows[identity] = {field: value for field, value in row.items() if value}
+        return {key: values for key, values in rows.items() if values}
+
+    def assertMatchesRebuild(self):
+        stored = self.stored()
+        rollups.rebuild()
+        self.assertEqual(stored, self.stored())
+
+    def test_moving_a_payment_to_another_event(self):
+        self.payment.event = self.events[1]
+        self.payment.save()
+        self.assertEqual(self.event_row(self.events[0]), {})
+        self.assertEqual(self.event_row(self.events[1]), {'payments_pending': 1, 'revenue_pending': Decimal('100.00')})
+        self.assertMatchesRebuild()
+
+    def test_moving_and_approving_in_one_save(self):
+        self.payment.event = self.events[1]
+        self.payment.status = 'approved'
+        self.payment.save()
+        self.assertEqual(self.event_row(self.events[0]), {})
+        self.assertEqual(self.event_row(self.events[1]), {'payments_approved': 1, 'revenue_approved': Decimal('100.00')})
+        self.assertMatchesRebuild()
+
+    def test_moving_a_payment_to_another_day(self):
+        day = timezone.localdate(self.payment.submitted_at)
+        self.payment.submitted_at -= timedelta(days=3)
+        self.payment.save()
+        self.assertEqual(self.event_row(self.events[0], day), {})
+        self.assertEqual(
+            self.event_row(self.events[0], day - timedelta(days=3)),
+            {'payments_pending': 1, 'revenue_pending': Decimal('100.00')},
+        )
+        self.assertMatchesRebuild()
+
+    def test_moving_a_deferred_payment(self):
+        deferred = Payment.objects.only('id').get(pk=self.payment.pk)
+        deferred.event = self.events[1]
+        deferred.save(update_fields=['event'])
+        self.assertEqual(self.event_row(self.events[0]), {})
+        self.assertEqual(self.event_row(self.events[1]), {'payments_pending': 1, 'revenue_pending': Decimal('100.00')})
+        self.assertMatchesRebuild()
+
+    def test_deleting_a_payment(self):
+        self.payment.delete()
+        self.assertEqual(self.event_row(self.events[0]), {})
+        self.assertMatchesRebuild()
+
+    def test_batch_writes_nothing_when_the_block_fails(self):
+        with self.assertRaises(RuntimeError), rollups.batch():
+            self.payment.status = 'approved'
+            self.payment.save()
+            raise RuntimeError
+        self.assertEqual(self.event_row(self.events[0]), {'payments_pending': 1, 'revenue_pending': Decimal('100.00')})
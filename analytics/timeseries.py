@@ -0,0 +1,150 @@
+"""
+Time-series helpers for analytics.
+
+Every metric is computed with a single grouped query over the whole window;
+empty buckets are filled in Python so the query count does not depend on the
+window length.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+GRANULARITIES = {
+    'hour': (TruncHour, timedelta(hours=1), '%Y-%m-%dT%H:00'),
+    'day': (TruncDay, timedelta(days=1), '%Y-%m-%d'),
+    'week': (TruncWeek, timedelta(weeks=1), '%Y-%m-%d'),
+}
+
+DEFAULT_GRANULARITY = 'day'
+DEFAULT_WINDOW_DAYS = 30
+MAX_BUCKETS = 1000
+
+
+def floor_to_bucket(value, granularity):
+    """Truncate a local datetime to the start of its bucket"""
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if granularity in ('day', 'week'):
+        value = value.replace(hour=0)
+    if granularity == 'week':
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+class TimeWindow:
+    """A half-open [start, end) range split into fixed-size buckets"""
+
+    def __init__(self, start, end, granularity=DEFAULT_GRANULARITY):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unsupported granularity '{granularity}'")
+        if start >= end:
+            raise ValueError("'from' must be earlier than 'to'")
+
+        self.granularity = granularity
+        self.trunc, self.step, self.label_format = GRANULARITIES[granularity]
+        self.start = floor_to_bucket(timezone.localtime(start), granularity)
+        self.end = timezone.localtime(end)
+
+        if len(self.buckets()) > MAX_BUCKETS:
+            raise ValueError(f"Window spans more than {MAX_BUCKETS} {granularity} buckets")
+
+    def buckets(self):
+        """Bucket start times in local time"""
+        buckets = []
+        current = self.start
+        while current < self.end:
+            buckets.append(current)
+            current += self.step
+        return buckets
+
+    def label(self, bucket):
+        return bucket.strftime(self.label_format)
+
+    def as_dict(self):
+        return {
+            'from': self.start.isoformat(),
+            'to': self.end.isoformat(),
+            'granularity': self.granularity,
+        }
+
+
+def parse_bound(value, end_of_day=False):
+    """Parse an ISO date or datetime; date-only values snap to local midnight"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date '{value}'")
+        parsed = datetime.combine(day, time.min)
+        if end_of_day:
+            parsed += timedelta(days=1)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_date_range(queryset, field, params):
+    """Apply inclusive ?from=&to= query parameters to ``field``.
+
+    Raises ValueError on malformed dates.
+    """
+    if params.get('from'):
+        queryset = queryset.filter(**{f'{field}__gte': parse_bound(params['from'])})
+    if params.get('to'):
+        queryset = queryset.filter(**{f'{field}__lt': parse_bound(params['to'], end_of_day=True)})
+    return queryset
+
+
+def parse_window(params, default_days=DEFAULT_WINDOW_DAYS):
+    """Build a TimeWindow from ?from=&to=&granularity= query parameters.
+
+    Date-only bounds are interpreted in the project time zone and ``to`` is
+    inclusive of the whole day. Raises ValueError on malformed input.
+    """
+    granularity = params.get('granularity') or DEFAULT_GRANULARITY
+    raw_from = params.get('from')
+    raw_to = params.get('to')
+
+    end = parse_bound(raw_to, end_of_day=True) if raw_to else timezone.now()
+    if raw_from:
+        start = parse_bound(raw_from)
+    else:
+        # Default to the last ``default_days`` buckets, including the current one
+        today = floor_to_bucket(timezone.localtime(end), 'day')
+        start = today - timedelta(days=default_days - 1)
+
+    return TimeWindow(start, end, granularity)
+
+
+def time_series(queryset, field, window, aggregate=None, key='count'):
+    """Aggregate ``queryset`` into the buckets of ``window`` with one query.
+
+    ``aggregate`` defaults to a row count; pass e.g. ``Sum('amount')`` for
+    other metrics. Returns ``[{'date': label, key: value}, ...]`` with a
+    zero-valued entry for every bucket without rows.
+    """
+    if aggregate is None:
+        aggregate = Count('pk')
+
+    rows = (
+        queryset
+        .filter(**{f'{field}__gte': window.start, f'{field}__lt': window.end})
+        .annotate(bucket=window.trunc(field, tzinfo=timezone.get_current_timezone()))
+        .values('bucket')
+        .annotate(value=aggregate)
+        .order_by('bucket')
+    )
+    values = {
+        timezone.localtime(row['bucket']).replace(tzinfo=None): row['value']
+        for row in rows
+    }
+
+    return [
+        {
+            'date': window.label(bucket),
+            key: values.get(bucket.replace(tzinfo=None)) or 0,
+        }
+        for bucket in window.buckets()
+    ]
@@ -3,4 +3,6 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='analytics-dashboard'),
+    path('stream/', views.activity_stream, name='analytics-stream'),
+    path('activities/', views.ActivityFeedView.as_view(), name='analytics-activities'),
 ]
@@ -1,16 +1,27 @@
+import logging
+from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from aiverse_api.fastjson import FastJSONRenderer
 from rest_framework.response import Response
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.contrib.auth import get_user_model
 from django.db.models import Sum, Count, Q
-from django.utils import timezone
-from datetime import timedelta
 from events.models import Event
 from payments.models import Payment
 from .models import Activity
+from .serializers import ActivitySerializer
+from .timeseries import parse_window, time_series
+from . import cache as dashboard_cache
+from . import broadcast, counters, rollups
 from users.views import IsAdminUser
+from aiverse_api.pagination import ActivityPagination
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 
 from rest_framework.permissions import AllowAny
 
@@ -20,75 +31,73 @@ def dashboard(request):
     """Dashboard analytics endpoint"""
     user_email = request.user.email if not request.user.is_anonymous else "Anonymous"
     is_admin = request.user.is_admin if not request.user.is_anonymous else False
-    print(f"Analytics dashboard accessed by: {user_email} (Admin: {is_admin})")
+    logger.info('Analytics dashboard accessed by: %s (Admin: %s)', user_email, is_admin)
     
-    # Get date range for chart data (last 30 days)
-    end_date = timezone.now()
-    start_date = end_date - timedelta(days=30)
+    try:
+        window = parse_window(request.query_params)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Basic stats
-    total_users = User.objects.count()
-    total_events = Event.objects.count()
-    total_payments = Payment.objects.count()
-    pending_payments = Payment.objects.filter(status='pending').count()
-    approved_payments = Payment.objects.filter(status='approved').count()
+    payload = dashboard_cache.get_or_compute(
+        request.query_params.dict(),
+        lambda: FastJSONRenderer().render(build_dashboard(window)),
+    )
+    return HttpResponse(payload, content_type='application/json')
+
+
+def build_dashboard(window):
+    """Compute the dashboard payload for a TimeWindow"""
+    # Basic stats - a single read of the materialized status counters
+    counts = counters.snapshot()
     
-    # Revenue stats
-    total_revenue = Payment.objects.filter(status='approved').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+    def count(entity, status_name=counters.ALL):
+        return counts[entity].get(status_name, {}).get('count', 0)
+    
+    def amount(entity, status_name):
+        return counts[entity].get(status_name, {}).get('amount') or 0
     
-    pending_revenue = Payment.objects.filter(status='pending').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+    total_users = count('user')
+    total_registrations = count('registration')
+    total_events = sum(row['count'] for row in counts['event'].values())
+    total_payments = sum(row['count'] for row in counts['payment'].values())
+    pending_payments = count('payment', 'pending')
+    approved_payments = count('payment', 'approved')
+    rejected_payments = count('payment', 'rejected')
+    
+    # Revenue stats
+    total_revenue = amount('payment', 'approved')
+    pending_revenue = amount('payment', 'pending')
     
     # Recent activities (last 10)
     recent_activities = Activity.objects.select_related('user').order_by('-timestamp')[:10]
-    activities_data = [
-        {
-            'id': activity.id,
-            'user': activity.user.full_name or activity.user.email,
-            'action': activity.action,
-            'type': activity.activity_type,
-            'time': activity.timestamp.isoformat(),
-        }
-        for activity in recent_activities
-    ]
+    activities_data = [broadcast.activity_payload(activity) for activity in recent_activities]
     
-    # Chart data - registrations over time
-    registrations_by_day = []
-    for i in range(30):
-        day = start_date + timedelta(days=i)
-        next_day = day + timedelta(days=1)
-        count = User.objects.filter(
-            created_at__gte=day,
-            created_at__lt=next_day
-        ).count()
-        registrations_by_day.append({
-            'date': day.strftime('%Y-%m-%d'),
-            'count': count
-        })
+    # Chart data - registrations over time, one grouped query for the window
+    if window.granularity == 'hour':
+        registrations_by_day = time_series(User.objects.all(), 'created_at', window)
+    else:
+        registrations_by_day = rollups.series(window, 'new_users')
     
     # Payment status distribution
     payment_status_distribution = [
         {'status': 'Pending', 'count': pending_payments},
         {'status': 'Approved', 'count': approved_payments},
-        {'status': 'Rejected', 'count': Payment.objects.filter(status='rejected').count()},
+        {'status': 'Rejected', 'count': rejected_payments},
     ]
     
     # Event status distribution
     event_status_distribution = [
-        {'status': 'Upcoming', 'count': Event.objects.filter(status='upcoming').count()},
-        {'status': 'Ongoing', 'count': Event.objects.filter(status='ongoing').count()},
-        {'status': 'Completed', 'count': Event.objects.filter(status='completed').count()},
+        {'status': 'Upcoming', 'count': count('event', 'upcoming')},
+        {'status': 'Ongoing', 'count': count('event', 'ongoing')},
+        {'status': 'Completed', 'count': count('event', 'completed')},
     ]
     
-    return Response({
+    return {
         'stats': {
             'total_users': total_users,
             'total_events': total_events,
-            'active_events': Event.objects.filter(status='upcoming').count() + Event.objects.filter(status='ongoing').count(),
-            'total_registrations': total_payments,
+            'active_events': count('event', 'upcoming') + count('event', 'ongoing'),
+            'total_registrations': total_registrations,
             'total_payments': total_payments,
             'pending_payments': pending_payments,
             'approved_payments': approved_payments,
@@ -100,5 +109,52 @@ def dashboard(request):
             'registrations_by_day': registrations_by_day,
             'payment_status_distribution': payment_status_distribution,
             'event_status_distribution': event_status_distribution,
+            'window': window.as_dict(),
         }
-    })
+    }
+
+
+async def activity_stream(request):
+    """Server-Sent Events feed of new activities and counter changes.
+
+    Resumes after the Activity id in ``Last-Event-ID`` (or ``?last_event_id=``
+    for the first connection). Under WSGI a worker can't be held for a
+    stream, so the response carries only what is available now and the
+    client reconnects after ``ACTIVITY_STREAM['RETRY']`` milliseconds.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    if isinstance(request, ASGIRequest):
+        stream = broadcast.event_stream(last_event_id)
+    else:
+        # WSGI can't stream async iterators; answer at once like a long-poll
+        stream = await sync_to_async(broadcast.poll_frames)(last_event_id)
+    
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class ActivityFeedView(generics.ListAPIView):
+    """Cursor-paginated activity feed, newest first (?type=, ?user=)"""
+    serializer_class = ActivitySerializer
+    pagination_class = ActivityPagination
+    permission_classes = [AllowAny]
+    
+    def get_queryset(self):
+        queryset = Activity.objects.select_related('user')
+        
+        activity_type = self.request.query_params.get('type', None)
+        if activity_type:
+            queryset = queryset.filter(activity_type=activity_type)
+        
+        user_id = self.request.query_params.get('user', None)
+        if user_id:
+            queryset = queryset.filter(user_id=user_id)
+        
+        return queryset
@@ -13,6 +13,7 @@ class EventAdmin(admin.ModelAdmin):
     list_filter = ['status', 'is_featured', 'date']
     search_fields = ['title', 'description', 'venue']
     prepopulated_fields = {'slug': ('title',)}
+    readonly_fields = ['registration_count']
     inlines = [EventImageInline]
     ordering = ['-date']
 
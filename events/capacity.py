@@ -0,0 +1,70 @@
+"""
+Seat accounting for events.
+
+``Event.registration_count`` holds the number of active registrations. It is
+only ever changed with a single conditional UPDATE, so concurrent
+registrations serialize on the event row instead of racing a COUNT, and a
+full event rejects the seat without a separate check. ``reconcile`` recounts
+from EventRegistration to repair any drift.
+"""
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+
+class EventFull(Exception):
+    """No seats are left for the event"""
+
+
+def reserve_seat(event_id, seats=1, enforce=True):
+    """Take ``seats`` seats, raising EventFull if that would exceed capacity"""
+    from .models import Event
+
+    events = Event.objects.filter(id=event_id)
+    if enforce:
+        # A blank or zero max_participants means unlimited, matching Event.is_full
+        events = events.filter(
+            Q(max_participants__isnull=True)
+            | Q(max_participants__lte=0)
+            | Q(registration_count__lte=F('max_participants') - seats)
+        )
+    if not events.update(registration_count=F('registration_count') + seats) and enforce:
+        if Event.objects.filter(id=event_id).exists():
+            raise EventFull(event_id)
+
+
+def release_seat(event_id, seats=1):
+    from .models import Event
+
+    Event.objects.filter(id=event_id, registration_count__gte=seats).update(
+        registration_count=F('registration_count') - seats
+    )
+
+
+def reconcile(fix=False, apps=None):
+    """Compare stored registration counts with a recount.
+
+    Returns a list of ``(event_id, stored, actual)`` mismatches. With
+    ``fix=True`` each drifted event is locked and recounted before it is
+    corrected, so registrations made meanwhile are not lost.
+    """
+    registry = apps or django_apps
+    Event = registry.get_model('events', 'Event')
+    EventRegistration = registry.get_model('events', 'EventRegistration')
+
+    mismatches = [
+        (event_id, stored, actual)
+        for event_id, stored, actual in Event.objects.order_by('id').annotate(
+            actual=Count('eventregistration', filter=Q(eventregistration__is_active=True))
+        ).values_list('id', 'registration_count', 'actual')
+        if stored != actual
+    ]
+
+    if fix:
+        for event_id, _, _ in mismatches:
+            with transaction.atomic():
+                list(Event.objects.select_for_update().filter(id=event_id).values_list('id', flat=True))
+                actual = EventRegistration.objects.filter(event_id=event_id, is_active=True).count()
+                Event.objects.filter(id=event_id).update(registration_count=actual)
+
+    return mismatches
@@ -0,0 +1,134 @@
+"""
+Manifests for the static event galleries under ``settings.GALLERY_ROOT``.
+
+``Event.gallery_dir`` names a folder of images served by the frontend from
+``/gallery/<dir>/``. Instead of clients probing that folder, it is scanned
+once (on save when ``gallery_dir``/``cover_image_name`` change, or by the
+``build_gallery_manifests`` command) and the result stored in
+``Event.gallery_manifest``::
+
+    {'dir': ..., 'cover': 'cover.jpg' | None, 'signature': ...,
+     'images': [{'name', 'url', 'width', 'height', 'bytes', 'color', 'placeholder'}]}
+
+``signature`` covers every file's name, size and mtime, so unchanged folders
+are skipped without decoding anything.
+"""
+import base64
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
+PLACEHOLDER_SIZE = 16
+COLOR_SAMPLE_SIZE = 64
+EXIF_ORIENTATION = 0x0112
+# Orientations that swap width and height
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def gallery_path(gallery_dir):
+    """Absolute folder for ``gallery_dir``, or None when galleries can't be scanned"""
+    root = settings.GALLERY_ROOT
+    if not root or not gallery_dir:
+        return None
+    path = os.path.realpath(os.path.join(root, gallery_dir))
+    if os.path.dirname(path) != os.path.realpath(root):
+        # Only direct children of the gallery root
+        return None
+    return path
+
+
+def list_images(path):
+    """``[(name, stat)]`` for the image files in ``path``, sorted by name"""
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return []
+    files = [
+        (entry.name, entry.stat()) for entry in entries
+        if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+    ]
+    return sorted(files, key=lambda item: item[0].lower())
+
+
+def listing_signature(files):
+    source = '|'.join(f'{name}:{stat.st_size}:{stat.st_mtime_ns}' for name, stat in files)
+    return hashlib.md5(source.encode(), usedforsecurity=False).hexdigest()
+
+
+def describe_image(path, name, size):
+    """Dimensions, dominant colour and a data-URI placeholder for one image"""
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as source:
+        # The size the browser lays out: stored size, rotated by the EXIF orientation
+        width, height = source.size
+        if source.getexif().get(EXIF_ORIENTATION) in ROTATED_ORIENTATIONS:
+            width, height = height, width
+        # Decode JPEGs at a fraction of their size; only thumbnails are needed
+        source.draft('RGB', (COLOR_SAMPLE_SIZE, COLOR_SAMPLE_SIZE))
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((COLOR_SAMPLE_SIZE, COLOR_SAMPLE_SIZE))
+        sample = image.convert('RGB')
+
+    placeholder = sample.copy()
+    placeholder.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = BytesIO()
+    placeholder.save(buffer, 'WEBP', quality=30)
+
+    return {
+        'name': name,
+        'width': width,
+        'height': height,
+        'bytes': size,
+        'color': dominant_color(sample),
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode(),
+    }
+
+
+def dominant_color(image):
+    """Most common colour of a small RGB image after reducing it to a few colours"""
+    quantized = image.quantize(colors=5)
+    _, index = max(quantized.getcolors())
+    palette = quantized.getpalette()
+    red, green, blue = palette[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def build_manifest(gallery_dir, cover_image_name, previous=None):
+    """Scan ``gallery_dir`` and return its manifest, or None when it can't be scanned.
+
+    ``previous`` is returned unchanged when the folder's signature still matches.
+    """
+    path = gallery_path(gallery_dir)
+    if path is None:
+        return None
+
+    files = list_images(path)
+    signature = listing_signature(files)
+    if previous and previous.get('signature') == signature and previous.get('dir') == gallery_dir:
+        names = {image['name'] for image in previous.get('images', [])}
+        return {**previous, 'cover': cover_image_name if cover_image_name in names else None}
+
+    images = []
+    for name, stat in files:
+        try:
+            entry = describe_image(os.path.join(path, name), name, stat.st_size)
+        except Exception as exc:
+            logger.warning('Skipping unreadable gallery image %s/%s: %s', gallery_dir, name, exc)
+            continue
+        entry['url'] = f'/gallery/{gallery_dir}/{name}'
+        images.append(entry)
+
+    names = {image['name'] for image in images}
+    return {
+        'dir': gallery_dir,
+        'cover': cover_image_name if cover_image_name in names else None,
+        'signature': signature,
+        'images': images,
+    }
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from events import gallery
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Scan each event gallery_dir under GALLERY_ROOT and store the result in Event.gallery_manifest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help='Only these events (default: every event with a gallery_dir)')
+        parser.add_argument('--force', action='store_true', help='Rescan folders whose files have not changed')
+
+    def handle(self, *args, **options):
+        if not settings.GALLERY_ROOT:
+            raise CommandError('GALLERY_ROOT is not set')
+
+        events = Event.objects.exclude(gallery_dir='').only('id', 'slug', 'gallery_dir', 'cover_image_name', 'gallery_manifest')
+        if options['slugs']:
+            events = events.filter(slug__in=options['slugs'])
+
+        updated = 0
+        for event in events:
+            previous = None if options['force'] else event.gallery_manifest
+            manifest = gallery.build_manifest(event.gallery_dir, event.cover_image_name, previous=previous)
+            if manifest is None:
+                self.stdout.write(self.style.WARNING(f'{event.slug}: {event.gallery_dir!r} is not a gallery folder'))
+                continue
+            if manifest == event.gallery_manifest:
+                continue
+            # update() skips the save signals; move updated_at for the event ETags
+            Event.objects.filter(pk=event.pk).update(gallery_manifest=manifest, updated_at=timezone.now())
+            updated += 1
+            cover = manifest['cover'] or 'no cover'
+            self.stdout.write(f"{event.slug}: {len(manifest['images'])} image(s), {cover}")
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} gallery manifest(s)'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from events import capacity
+
+
+class Command(BaseCommand):
+    help = 'Recount active registrations per event and compare them with Event.registration_count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite the stored counts with the recount')
+
+    def handle(self, *args, **options):
+        mismatches = capacity.reconcile(fix=options['fix'])
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Registration counts match the registrations table'))
+            return
+
+        for event_id, stored, actual in mismatches:
+            self.stdout.write(self.style.WARNING(f'event {event_id}: stored {stored}, actual {actual}'))
+
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(mismatches)} event(s)'))
+        else:
+            raise CommandError(f'{len(mismatches)} event(s) out of sync; rerun with --fix to repair')
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events import timeline
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        'Move Event.status to upcoming/ongoing/completed as events start and end '
+        '(the same rule as /api/events/timeline/)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true',
+                            help='Keep running, waking at the next event start or end')
+        parser.add_argument('--max-sleep', type=float, default=60.0,
+                            help='With --watch, seconds between checks at most (picks up edited dates)')
+
+    def handle(self, *args, **options):
+        if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+            # Cache invalidations from this process never reach the web workers
+            self.stderr.write(self.style.WARNING(
+                'The default cache is per-process (LocMemCache): web workers keep serving '
+                'dashboard payloads cached before each transition until they expire. '
+                'Set REDIS_URL so this job and the web workers share a cache.'
+            ))
+        self.transition()
+        while options['watch']:
+            time.sleep(self.seconds_to_next_boundary(options['max_sleep']))
+            self.transition()
+
+    def transition(self):
+        moved = timeline.transition_statuses()
+        for (previous, status), count in sorted(moved.items()):
+            self.stdout.write(f'{previous} -> {status}: {count} event(s)')
+        if not moved:
+            self.stdout.write(self.style.SUCCESS('Event statuses match their dates'))
+
+    @staticmethod
+    def seconds_to_next_boundary(max_sleep):
+        now = timezone.now()
+        conditions = timeline.status_conditions(now)
+        events = Event.objects.exclude(status='cancelled').filter(
+            conditions['upcoming'] | conditions['ongoing']
+        ).only('date', 'end_date')
+        boundary = timeline.next_boundary(events, now)
+        if boundary is None:
+            return max_sleep
+        # Wake just after the boundary so the event has crossed it
+        return min(max_sleep, (boundary - now).total_seconds() + 0.01)
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+def backfill_registration_counts(apps, schema_editor):
+    from events.capacity import reconcile
+    reconcile(fix=True, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='registration_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Active registrations, maintained by events.capacity'),
+        ),
+        migrations.RunPython(backfill_registration_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_registration_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'date', 'id'], name='event_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['event', 'is_active'], name='registration_event_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['-registered_at', '-id'], name='registration_registered_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='featured_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies, maintained by aiverse_api.images'),
+        ),
+        migrations.AddField(
+            model_name='eventimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies, maintained by aiverse_api.images'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='gallery_manifest',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Scanned contents of gallery_dir, maintained by events.gallery'),
+        ),
+    ]
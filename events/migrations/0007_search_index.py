@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:05
+
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from events.search import index
+    index.install(schema_editor)
+
+
+def uninstall(apps, schema_editor):
+    from events.search import index
+    index.uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_gallery_manifest'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
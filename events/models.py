@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from aiverse_api.images import PreserveVariantsMixin, unchanged_variant_fields
 
 User = get_user_model()
 
@@ -26,8 +27,13 @@ class Event(models.Model):
     highlights = models.TextField(blank=True, default='[]', help_text="JSON string of highlights")
     gallery_dir = models.CharField(max_length=100, blank=True, help_text="Directory name in public/gallery/")
     cover_image_name = models.CharField(max_length=100, default='cover.jpg', help_text="Filename of the cover image in the gallery directory")
+    gallery_manifest = models.JSONField(default=dict, blank=True, editable=False, help_text="Scanned contents of gallery_dir, maintained by events.gallery")
     featured_image = models.ImageField(upload_to='event_images/', blank=True, null=True)
+    featured_image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies, maintained by aiverse_api.images")
     is_featured = models.BooleanField(default=False)
+    registration_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="Active registrations, maintained by events.capacity"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -35,25 +41,42 @@ class Event(models.Model):
         ordering = ['-date']
         verbose_name = 'Event'
         verbose_name_plural = 'Events'
+        indexes = [
+            # past/upcoming/current: filter by status, page by (date, id)
+            models.Index(fields=['status', 'date', 'id'], name='event_status_date_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
+    def save(self, *args, **kwargs):
+        # registration_count only changes through conditional UPDATEs, and the
+        # variants of an unchanged image only through the variants job; never
+        # write back the possibly stale copies loaded with this instance
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skip = {'registration_count', *unchanged_variant_fields(self)}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skip
+            ]
+        super().save(*args, **kwargs)
+    
     @property
     def total_registrations(self):
-        return self.eventregistration_set.filter(is_active=True).count()
+        return self.registration_count
     
     @property
     def is_full(self):
         if self.max_participants:
-            return self.total_registrations >= self.max_participants
+            return self.registration_count >= self.max_participants
         return False
 
 
-class EventImage(models.Model):
+class EventImage(PreserveVariantsMixin, models.Model):
     """Gallery images for events"""
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='event_gallery/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies, maintained by aiverse_api.images")
     caption = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
@@ -74,6 +97,12 @@ class EventRegistration(models.Model):
     class Meta:
         unique_together = ['user', 'event']
         ordering = ['-registered_at']
+        indexes = [
+            # Active-seat counts per event
+            models.Index(fields=['event', 'is_active'], name='registration_event_active_idx'),
+            # Cursor-paginated registration lists
+            models.Index(fields=['-registered_at', '-id'], name='registration_registered_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.event.title}"
@@ -0,0 +1,108 @@
+"""
+Resolves the event that registrations and payments attach to.
+
+The event is the one named by a slug from the request, else
+``settings.ACTIVE_EVENT['SLUG']``, else the next upcoming event. Lookups are
+cached in-process as frozen ``ActiveEvent`` snapshots for
+``ACTIVE_EVENT['CACHE_TTL']`` seconds and dropped whenever an Event is saved
+or deleted, so write requests normally need no Event query.
+"""
+import threading
+import time
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import Case, Q, When
+
+SNAPSHOT_FIELDS = ('id', 'slug', 'title', 'registration_fee', 'max_participants')
+
+
+@dataclass(frozen=True)
+class ActiveEvent:
+    """The Event fields write paths need, detached from the database row"""
+    id: int
+    slug: str
+    title: str
+    registration_fee: Decimal
+    max_participants: Optional[int]
+
+    def as_event(self):
+        """An Event carrying only the snapshot fields, for assigning relations without a query"""
+        from .models import Event
+
+        return Event(**asdict(self))
+
+
+_cache = {}
+_generation = 0
+_lock = threading.Lock()
+
+
+def _cached(key, load):
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        generation = _generation
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    value = load()
+    with _lock:
+        # Don't store a value loaded before an invalidation
+        if generation == _generation:
+            _cache[key] = (now + settings.ACTIVE_EVENT['CACHE_TTL'], value)
+    return value
+
+
+def _snapshot(queryset):
+    row = queryset.values(*SNAPSHOT_FIELDS).first()
+    return ActiveEvent(**row) if row else None
+
+
+def _default_event():
+    from .models import Event
+
+    configured = settings.ACTIVE_EVENT['SLUG']
+    return _snapshot(
+        Event.objects.filter(Q(slug=configured) | Q(status='upcoming')).order_by(
+            Case(When(slug=configured, then=0), default=1), '-date'
+        )
+    )
+
+
+def active_event(slug=None):
+    """The event named by ``slug``, or the configured/next upcoming event; None if there is none"""
+    from .models import Event
+
+    if slug:
+        return _cached(('slug', slug), lambda: _snapshot(Event.objects.filter(slug=slug)))
+    return _cached(('default',), _default_event)
+
+
+def get_event(event_id):
+    """Snapshot of the event with ``event_id``, or None"""
+    from .models import Event
+
+    if event_id is None:
+        return None
+    return _cached(('id', event_id), lambda: _snapshot(Event.objects.filter(id=event_id)))
+
+
+def event_of(instance):
+    """Snapshot of ``instance.event``, reusing the related Event if it is already loaded"""
+    field = instance._meta.get_field('event')
+    if field.is_cached(instance):
+        event = field.get_cached_value(instance)
+        if event is None:
+            return None
+        return ActiveEvent(**{name: getattr(event, name) for name in SNAPSHOT_FIELDS})
+    return get_event(instance.event_id)
+
+
+def invalidate():
+    global _generation
+    with _lock:
+        _cache.clear()
+        _generation += 1
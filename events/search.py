@@ -0,0 +1,9 @@
+"""Full-text index over events for ``/api/events/search/``"""
+from aiverse_api.search import SearchIndex
+from .models import Event
+
+index = SearchIndex(
+    Event,
+    fields={'title': 'A', 'short_description': 'B', 'venue': 'B', 'description': 'C'},
+    snippet_field='description',
+)
@@ -1,14 +1,17 @@
 from rest_framework import serializers
+from aiverse_api.fieldsets import SparseFieldsetSerializerMixin
+from aiverse_api.images import SrcsetField
 from .models import Event, EventImage, EventRegistration
 
 
 class EventImageSerializer(serializers.ModelSerializer):
     """Serializer for event images"""
     image_url = serializers.SerializerMethodField()
+    image_srcset = SrcsetField('image')
     
     class Meta:
         model = EventImage
-        fields = ['id', 'image', 'image_url', 'caption', 'uploaded_at']
+        fields = ['id', 'image', 'image_url', 'image_srcset', 'caption', 'uploaded_at']
         read_only_fields = ['id', 'uploaded_at']
     
     def get_image_url(self, obj):
@@ -18,11 +21,13 @@ class EventImageSerializer(serializers.ModelSerializer):
         return None
 
 
-class EventSerializer(serializers.ModelSerializer):
-    """Serializer for events"""
+class EventSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """Serializer for events (supports ?fields=/?omit=)"""
     images = EventImageSerializer(many=True, read_only=True)
     featured_image_url = serializers.SerializerMethodField()
+    featured_image_srcset = SrcsetField('featured_image')
     cover_image_url = serializers.SerializerMethodField()
+    # Model properties over the stored registration_count column, not a queryset annotation
     total_registrations = serializers.ReadOnlyField()
     is_full = serializers.ReadOnlyField()
     
@@ -31,9 +36,15 @@ class EventSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'slug', 'description', 'short_description', 
                   'date', 'end_date', 'venue', 'registration_fee', 'max_participants',
                   'status', 'highlights', 'gallery_dir', 'cover_image_name', 'cover_image_url',
-                  'featured_image', 'featured_image_url', 'is_featured',
+                  'gallery_manifest', 'featured_image', 'featured_image_url', 'featured_image_srcset', 'is_featured',
                   'images', 'total_registrations', 'is_full', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'gallery_manifest', 'created_at', 'updated_at']
+        field_dependencies = {
+            'featured_image_url': ['featured_image'],
+            'cover_image_url': ['gallery_dir', 'cover_image_name'],
+            'total_registrations': ['registration_count'],
+            'is_full': ['registration_count', 'max_participants'],
+        }
     
     def get_featured_image_url(self, obj):
         request = self.context.get('request')
@@ -47,6 +58,14 @@ class EventSerializer(serializers.ModelSerializer):
         return None
 
 
+class EventSummarySerializer(serializers.ModelSerializer):
+    """Compact event for ?expand= on related objects"""
+    
+    class Meta:
+        model = Event
+        fields = ['id', 'slug', 'title', 'date']
+
+
 class EventRegistrationSerializer(serializers.ModelSerializer):
     """Serializer for event registrations"""
     user_email = serializers.EmailField(source='user.email', read_only=True)
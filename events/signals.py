@@ -1,27 +1,154 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
-from .models import EventRegistration
+from django.utils import timezone
+from .models import Event, EventImage, EventRegistration
+from . import capacity, gallery, resolver, timeline
+from . import search  # registers the index for rebuild_search_index
 from payments.models import Payment
+from analytics import counters, rollups
+from aiverse_api import images
+
+images.register(Event, 'featured_image')
+images.register(EventImage, 'image')
+
+
+def invalidate_timeline(sender, **kwargs):
+    timeline.invalidate()
+
+
+# Events, their galleries and seat counts are all part of the timeline payload
+for model in (Event, EventImage, EventRegistration):
+    post_save.connect(invalidate_timeline, sender=model, dispatch_uid=f'timeline-save-{model.__name__}')
+    post_delete.connect(invalidate_timeline, sender=model, dispatch_uid=f'timeline-delete-{model.__name__}')
+
+
+@receiver(post_init, sender=Event)
+def remember_event_status(sender, instance, **kwargs):
+    # None when status was deferred
+    instance._saved_status = instance.__dict__.get('status')
+
+
+@receiver(pre_save, sender=Event)
+def load_deferred_event_status(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Loaded with .only(): read the stored status before this save overwrites it
+    if raw or instance._state.adding or instance._saved_status is not None:
+        return
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    instance._saved_status = Event.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_init, sender=Event)
+def remember_event_gallery(sender, instance, **kwargs):
+    instance._saved_gallery = (instance.__dict__.get('gallery_dir'), instance.__dict__.get('cover_image_name'))
+
+
+@receiver(pre_save, sender=Event)
+def refresh_gallery_manifest(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Scan the gallery folder when it is first set or changes, never per request
+    if raw or 'gallery_dir' not in instance.__dict__:
+        return
+    if update_fields is not None and 'gallery_manifest' not in update_fields:
+        return
+    current = (instance.gallery_dir, instance.cover_image_name)
+    if current == instance._saved_gallery and instance.gallery_manifest:
+        return
+    manifest = gallery.build_manifest(*current, previous=instance.gallery_manifest)
+    if manifest is not None:
+        instance.gallery_manifest = manifest
+    elif instance.gallery_dir != instance._saved_gallery[0]:
+        # A folder that can't be scanned; don't keep describing the old one
+        instance.gallery_manifest = {}
+    instance._saved_gallery = current
+
+
+@receiver(post_save, sender=Event)
+def event_post_save(sender, instance, created, **kwargs):
+    resolver.invalidate()
+    if kwargs.get('raw'):
+        return
+    if created or instance._saved_status is not None:
+        counters.record_event(instance, previous=instance._saved_status, created=created)
+        instance._saved_status = instance.status
+
+
+@receiver(post_delete, sender=Event)
+def event_post_delete(sender, instance, **kwargs):
+    resolver.invalidate()
+    counters.record_event_deleted(instance)
+
+
+@receiver(images.variants_ready)
+def touch_event_for_variants(sender, pk, **kwargs):
+    # Variants change the serialized event, so move updated_at for the
+    # conditional GET validators (update() skips the save signals)
+    if sender is Event:
+        Event.objects.filter(pk=pk).update(updated_at=timezone.now())
+        timeline.invalidate()
+    elif sender is EventImage:
+        Event.objects.filter(images__pk=pk).update(updated_at=timezone.now())
+        timeline.invalidate()
+
+
+@receiver(post_init, sender=EventRegistration)
+def remember_registration_active(sender, instance, **kwargs):
+    # None when is_active was deferred
+    instance._saved_active = instance.__dict__.get('is_active')
+
+
+@receiver(pre_save, sender=EventRegistration)
+def registration_pre_save(sender, instance, update_fields=None, **kwargs):
+    # Take the seat before the row is written so a full event rejects the insert
+    if kwargs.get('raw'):
+        return
+    if instance._state.adding:
+        was_active = False
+    elif instance._saved_active is not None:
+        was_active = instance._saved_active
+    elif update_fields is not None and 'is_active' not in update_fields:
+        return
+    else:
+        # Loaded with .only(): read the stored flag before this save overwrites it
+        was_active = EventRegistration.objects.filter(pk=instance.pk).values_list('is_active', flat=True).first()
+    if instance.is_active and not was_active:
+        capacity.reserve_seat(instance.event_id)
+    elif was_active and not instance.is_active:
+        capacity.release_seat(instance.event_id)
+    instance._saved_active = instance.is_active
+
+
+@receiver(post_delete, sender=EventRegistration)
+def registration_post_delete(sender, instance, **kwargs):
+    rollups.record_registration(instance, sign=-1)
+    counters.record_registration(sign=-1)
+    if instance.is_active:
+        capacity.release_seat(instance.event_id)
+
 
 @receiver(post_save, sender=EventRegistration)
 def create_payment_for_registration(sender, instance, created, **kwargs):
-    if created:
-        event = instance.event
+    if created and not kwargs.get('raw'):
+        rollups.record_registration(instance)
+        counters.record_registration()
+        
+        event = resolver.event_of(instance)
         # Only create payment if there is a fee
         if event.registration_fee > 0:
-            # Check if payment already exists (avoid duplicates)
-            if not Payment.objects.filter(user=instance.user, event=event).exists():
+            # Check if payment already exists (avoid duplicates); a user created
+            # along with this registration can't have one
+            new_user = getattr(instance, '_new_user', False)
+            if new_user or not Payment.objects.filter(user=instance.user, event_id=event.id).exists():
                 Payment.objects.create(
                     user=instance.user,
-                    event=event,
+                    event_id=event.id,
                     amount=event.registration_fee,
                     status='pending',
                     notes=f"Auto-created upon registration for {event.title}"
                 )
         
         # Log activity
-        from analytics.models import Activity
-        Activity.objects.create(
+        from analytics.activity_log import log_activity
+        log_activity(
             user=instance.user,
             action=f"Registered for {event.title}",
             activity_type='registration'
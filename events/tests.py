@@ -0,0 +1,204 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from . import capacity, resolver
+from .capacity import EventFull
+from .models import Event, EventRegistration
+
+User = get_user_model()
+
+
+def make_event(slug='event', **fields):
+    defaults = {
+        'title': slug.title(), 'description': 'An event', 'venue': 'Main Hall',
+        'date': timezone.now() + timedelta(days=7),
+    }
+    return Event.objects.create(slug=slug, **{**defaults, **fields})
+
+
+def make_user(n):
+    return User.objects.create(email=f'user{n}@example.com', username=f'user{n}', full_name=f'User {n}')
+
+
+class CapacityTests(TestCase):
+    """Event.registration_count follows active registrations and enforces max_participants"""
+
+    def setUp(self):
+        resolver.invalidate()
+        self.event = make_event(max_participants=2)
+        self.users = [make_user(n) for n in range(3)]
+
+    def seats(self):
+        return Event.objects.values_list('registration_count', flat=True).get(pk=self.event.pk)
+
+    def register(self, user, **fields):
+        return EventRegistration.objects.create(user=user, event=self.event, **fields)
+
+    def test_registrations_take_seats_until_full(self):
+        self.register(self.users[0])
+        self.register(self.users[1])
+        self.assertEqual(self.seats(), 2)
+
+        with self.assertRaises(EventFull), transaction.atomic():
+            self.register(self.users[2])
+        self.assertEqual(self.seats(), 2)
+        self.assertFalse(EventRegistration.objects.filter(user=self.users[2]).exists())
+
+    def test_unlimited_event_is_never_full(self):
+        Event.objects.filter(pk=self.event.pk).update(max_participants=None)
+        for user in self.users:
+            self.register(user)
+        self.assertEqual(self.seats(), 3)
+
+    def test_inactive_registration_takes_no_seat(self):
+        self.register(self.users[0], is_active=False)
+        self.assertEqual(self.seats(), 0)
+
+    def test_deactivating_and_reactivating_moves_the_seat(self):
+        registration = self.register(self.users[0])
+        registration.is_active = False
+        registration.save()
+        self.assertEqual(self.seats(), 0)
+
+        registration.is_active = True
+        registration.save()
+        self.assertEqual(self.seats(), 1)
+
+    def test_deactivating_a_deferred_registration_releases_the_seat(self):
+        registration = self.register(self.users[0])
+        deferred = EventRegistration.objects.only('id', 'event').get(pk=registration.pk)
+        deferred.is_active = False
+        deferred.save(update_fields=['is_active'])
+        self.assertEqual(self.seats(), 0)
+
+    def test_deleting_releases_the_seat(self):
+        self.register(self.users[0]).delete()
+        self.register(self.users[1], is_active=False).delete()
+        self.assertEqual(self.seats(), 0)
+
+    def test_event_save_does_not_write_back_a_stale_count(self):
+        self.register(self.users[0])
+        event = Event.objects.get(pk=self.event.pk)
+        self.register(self.users[1])
+        event.title = 'Renamed'
+        event.save()
+        self.assertEqual(self.seats(), 2)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.register(self.users[0])
+        self.register(self.users[1])
+        Event.objects.filter(pk=self.event.pk).update(registration_count=5)
+
+        self.assertEqual(capacity.reconcile(), [(self.event.pk, 5, 2)])
+        self.assertEqual(self.seats(), 5)
+        self.assertEqual(capacity.reconcile(fix=True), [(self.event.pk, 5, 2)])
+        self.assertEqual(self.seats(), 2)
+        self.assertEqual(capacity.reconcile(), [])
+
+    def test_registration_endpoint_rejects_a_full_event(self):
+        self.register(self.users[0])
+        self.register(self.users[1])
+        response = self.client.post(
+            '/api/registrations/',
+            {'email': 'late@example.com', 'fullName': 'Late', 'event_slug': self.event.slug},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.seats(), 2)
+        self.assertFalse(EventRegistration.objects.filter(user__email='late@example.com').exists())
+
+
+class ConditionalGetTests(TestCase):
+    """The event endpoints answer If-None-Match with 304 until the events change"""
+
+    def setUp(self):
+        resolver.invalidate()
+        self.event = make_event()
+
+    def test_list_and_detail_answer_a_current_etag_with_304(self):
+        for url in ('/api/events/', f'/api/events/{self.event.slug}/'):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.has_header('Last-Modified'))
+
+                cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached.content, b'')
+                self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_etag_changes_when_an_event_is_edited(self):
+        etag = self.client.get('/api/events/')['ETag']
+        self.event.title = 'Renamed'
+        self.event.save()
+        response = self.client.get('/api/events/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_when_a_seat_is_taken(self):
+        etag = self.client.get('/api/events/')['ETag']
+        EventRegistration.objects.create(user=make_user(0), event=self.event)
+        self.assertEqual(self.client.get('/api/events/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_the_query(self):
+        full = self.client.get('/api/events/')['ETag']
+        sparse = self.client.get('/api/events/?fields=id,slug')
+        self.assertNotEqual(sparse['ETag'], full)
+        self.assertEqual(self.client.get('/api/events/?fields=id,slug', HTTP_IF_NONE_MATCH=full).status_code, 200)
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset pages follow the ordering, break timestamp ties by id and never repeat or skip rows"""
+
+    def setUp(self):
+        resolver.invalidate()
+        start = timezone.now() + timedelta(days=1)
+        # Two events per date, so every page boundary can fall inside a tie
+        self.events = [
+            make_event(f'event-{n}', date=start + timedelta(days=n // 2)) for n in range(7)
+        ]
+        Event.objects.filter(slug='event-6').update(status='completed')
+
+    def walk(self, url):
+        """Rows from every page of ``url``, following ``next`` links"""
+        rows = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            rows.extend(response.data['results'])
+            url = response.data['next']
+        return rows
+
+    def test_upcoming_pages_are_soonest_first(self):
+        rows = self.walk('/api/events/upcoming/?page_size=2')
+        expected = Event.objects.filter(status='upcoming').order_by('date', 'id')
+        self.assertEqual([row['slug'] for row in rows], [event.slug for event in expected])
+
+    def test_past_pages_are_latest_first(self):
+        Event.objects.update(status='completed')
+        rows = self.walk('/api/events/past/?page_size=3')
+        expected = Event.objects.order_by('-date', '-id')
+        self.assertEqual([row['slug'] for row in rows], [event.slug for event in expected])
+
+    def test_registrations_sharing_a_timestamp_are_paged_by_id(self):
+        event = Event.objects.filter(status='upcoming').order_by('id').first()
+        for n in range(5):
+            EventRegistration.objects.create(user=make_user(n), event=event)
+        EventRegistration.objects.update(registered_at=timezone.now())
+
+        rows = self.walk('/api/registrations/?page_size=2')
+        ids = list(EventRegistration.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in rows], ids)
+
+    def test_rows_added_while_paging_do_not_shift_later_pages(self):
+        first = self.client.get('/api/events/upcoming/?page_size=2').data
+        make_event('earliest', date=timezone.now())
+        rest = self.walk(first['next'])
+        expected = Event.objects.filter(status='upcoming').exclude(slug='earliest').order_by('date', 'id')
+        self.assertEqual(
+            [row['slug'] for row in first['results'] + rest], [event.slug for event in expected]
+        )
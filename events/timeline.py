@@ -0,0 +1,159 @@
+"""
+The event timeline: upcoming, current and past events in one response.
+
+Buckets are derived from ``date``/``end_date`` at request time rather than
+read from ``Event.status``: an event is upcoming until ``date``, current
+until ``end_date`` and past afterwards. Without an ``end_date`` a started
+event is current until its status says ``completed``. Cancelled events are
+left out.
+
+The serialized timeline is cached until the next moment an event changes
+bucket (the earliest ``date``/``end_date`` still ahead), capped at
+``EVENT_TIMELINE['CACHE_MAX_TTL']``, and keyed by a data version that the
+event signals bump on every write, as in ``analytics.cache``.
+``transition_statuses`` writes the derived status back to ``Event.status``
+in bulk so the column agrees with the timeline. The cached payload never
+relies on that having happened: its ``status`` is the derived one, since
+the job's invalidations only reach other processes through a shared cache.
+"""
+import hashlib
+import math
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+VERSION_KEY = 'events:timeline:version'
+
+# Response keys for the derived statuses
+BUCKETS = {'upcoming': 'upcoming', 'ongoing': 'current', 'completed': 'past'}
+
+
+def status_conditions(now):
+    """``{status: Q}`` selecting the non-cancelled events that should have each status at ``now``"""
+    started = Q(date__lte=now)
+    return {
+        'upcoming': Q(date__gt=now),
+        'ongoing': started & (Q(end_date__gt=now) | Q(end_date__isnull=True) & ~Q(status='completed')),
+        'completed': started & (Q(end_date__lte=now) | Q(end_date__isnull=True, status='completed')),
+    }
+
+
+def derived_status(now):
+    """Expression for the status an event should have at ``now``"""
+    return Case(
+        When(status='cancelled', then=Value('cancelled')),
+        *(When(condition, then=Value(status)) for status, condition in status_conditions(now).items()),
+        default=F('status'),
+    )
+
+
+def next_boundary(events, now):
+    """Earliest ``date``/``end_date`` after ``now`` among ``events``, or None"""
+    upcoming = [
+        moment for event in events for moment in (event.date, event.end_date)
+        if moment is not None and moment > now
+    ]
+    return min(upcoming, default=None)
+
+
+def data_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted version never reuses old keys
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        data_version()
+
+
+def invalidate():
+    """Bump the data version once the current transaction commits"""
+    transaction.on_commit(_bump)
+
+
+def cache_key(request):
+    # The URL (its host for absolute media URLs, ?fields=) and media type pick the variant
+    accepted = getattr(request, 'accepted_media_type', '') or ''
+    source = f'{request.build_absolute_uri()}|{accepted}'
+    digest = hashlib.md5(source.encode(), usedforsecurity=False).hexdigest()
+    return f'events:timeline:v{data_version()}:{digest}'
+
+
+def get_or_compute(request, compute):
+    """``{'data', 'next_change', 'expires'}`` for ``request``, from the cache or ``compute(now)``.
+
+    ``compute`` returns ``(data, next_boundary)``.
+    """
+    key = cache_key(request)
+    now = timezone.now()
+    entry = cache.get(key)
+    # Backend timeouts are whole seconds; the entry itself knows its exact expiry
+    if entry is not None and entry['expires'] > now:
+        return entry
+
+    data, boundary = compute(now)
+    expires = now + timedelta(seconds=settings.EVENT_TIMELINE['CACHE_MAX_TTL'])
+    if boundary is not None:
+        expires = min(expires, boundary)
+    entry = {'data': data, 'next_change': boundary, 'expires': expires}
+    cache.set(key, entry, max(1, math.ceil((expires - now).total_seconds())))
+    return entry
+
+
+def cache_control(expires, now=None):
+    """``settings.PUBLIC_CACHE_CONTROL`` with no lifetime reaching past ``expires``"""
+    remaining = max(0, int((expires - (now or timezone.now())).total_seconds()))
+    return {
+        name: min(value, remaining) if isinstance(value, int) and not isinstance(value, bool) else value
+        for name, value in settings.PUBLIC_CACHE_CONTROL.items()
+    }
+
+
+def transition_statuses(now=None):
+    """Move every event whose ``status`` disagrees with its dates to the derived status.
+
+    Each target status is a single bulk UPDATE that also sets ``updated_at``;
+    the dashboard counters are adjusted and the caches invalidated as the
+    save signals would have. Returns ``Counter({(old, new): events})``.
+    """
+    from analytics import cache as dashboard_cache
+    from analytics import counters
+    from . import resolver
+    from .models import Event
+
+    now = now or timezone.now()
+    moved = Counter()
+    with transaction.atomic():
+        for status, condition in status_conditions(now).items():
+            rows = list(
+                Event.objects.select_for_update().exclude(status='cancelled').filter(condition)
+                .exclude(status=status).values_list('id', 'status')
+            )
+            if not rows:
+                continue
+            Event.objects.filter(id__in=[event_id for event_id, _ in rows]).update(status=status, updated_at=now)
+            for _, previous in rows:
+                moved[(previous, status)] += 1
+
+        for (previous, status), count in moved.items():
+            counters.adjust('event', previous, -count, create=False)
+            counters.adjust('event', status, count)
+
+        if moved:
+            # update() sends no post_save: do what the Event signal handlers do
+            resolver.invalidate()
+            dashboard_cache.invalidate()
+            invalidate()
+    return moved
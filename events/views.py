@@ -1,16 +1,120 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.db.models import OuterRef, Subquery
+from . import resolver, search, timeline
+from .capacity import EventFull
 from .models import Event, EventImage, EventRegistration
 from .serializers import EventSerializer, EventImageSerializer, EventRegistrationSerializer
 from users.views import IsAdminUser
+from analytics import activity_log, rollups
+from analytics.timeseries import filter_date_range
+from aiverse_api.conditional import conditional_response, make_etag
+from aiverse_api.exports import export_response, requested_format
+from aiverse_api.fieldsets import SparseFieldsetViewMixin
+from aiverse_api.pagination import PastEventPagination, RegistrationPagination, UpcomingEventPagination
 
 
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
 
-class EventViewSet(viewsets.ModelViewSet):
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+
+REGISTRATION_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('user_email', 'user.email'),
+    ('user_name', 'user.full_name'),
+    ('user_phone', 'user.phone'),
+    ('college', 'user.college'),
+    ('department', 'user.department'),
+    ('year_of_study', 'user.year_of_study'),
+    ('event', 'event.slug'),
+    ('event_title', 'event.title'),
+    ('registered_at', 'registered_at'),
+    ('is_active', 'is_active'),
+]
+
+# Registration form keys and the User fields they update
+REGISTRATION_USER_FIELDS = {
+    'fullName': 'full_name',
+    'phone': 'phone',
+    'collegeName': 'college',
+    'branchName': 'department',
+    'yearOfStudy': 'year_of_study',
+}
+
+
+def filter_registrations(queryset, params):
+    """Registration list filters shared by the list and export endpoints"""
+    # Filter by user
+    user_id = params.get('user', None)
+    if user_id:
+        queryset = queryset.filter(user_id=user_id)
+    
+    # Filter by event
+    event_slug = params.get('event', None)
+    if event_slug:
+        queryset = queryset.filter(event__slug=event_slug)
+    
+    # Filter by active status
+    is_active = params.get('is_active', None)
+    if is_active:
+        queryset = queryset.filter(is_active=is_active.lower() == 'true')
+    
+    # Filter by registration date (?from=&to=)
+    try:
+        return filter_date_range(queryset, 'registered_at', params)
+    except ValueError as exc:
+        raise ParseError(str(exc))
+
+
+def register(user, event, new_user=False):
+    """``(registration, created)`` for ``user`` at ``event`` (a ``resolver.ActiveEvent``).
+
+    Registrations are written through ``save()`` so the seat, rollups and
+    payment follow from the usual signals. A user created in the same
+    transaction can't be registered yet, so that lookup is skipped. A
+    concurrent registration makes the insert raise IntegrityError.
+    """
+    if not new_user:
+        registration = EventRegistration.objects.filter(user=user, event_id=event.id).first()
+        if registration is not None:
+            return registration, False
+
+    registration = EventRegistration(user=user, event=event.as_event())
+    # Tells the post_save handler this user can't have paid for the event yet
+    registration._new_user = new_user
+    registration.save()
+    return registration, True
+
+
+def event_validators(queryset):
+    """``(etag parts, last_modified)`` for a queryset of events, from one aggregate query"""
+    images = EventImage.objects.filter(event=OuterRef('pk')).order_by()
+    stats = queryset.order_by().annotate(
+        latest_image=Subquery(images.order_by('-uploaded_at').values('uploaded_at')[:1]),
+        image_count=Subquery(
+            images.values('event').annotate(n=models.Count('id')).values('n'),
+            output_field=models.IntegerField(),
+        ),
+    ).aggregate(
+        events=models.Count('id'),
+        id_total=models.Sum('id'),
+        updated=models.Max('updated_at'),
+        image_updated=models.Max('latest_image'),
+        images=models.Sum('image_count'),
+        # Seats change through UPDATEs that leave updated_at alone
+        registrations=models.Sum('registration_count'),
+    )
+    modified = [value for value in (stats['updated'], stats['image_updated']) if value is not None]
+    return list(stats.values()), max(modified, default=None)
+
+
+class EventViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for event management"""
     queryset = Event.objects.all()
     serializer_class = EventSerializer
@@ -24,8 +128,16 @@ class EventViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return [AllowAny()]
     
+    def base_queryset(self):
+        """Events with their gallery images prefetched.
+
+        Registration counts are not annotated: total_registrations and is_full
+        read the Event.registration_count column kept by events.capacity.
+        """
+        return Event.objects.prefetch_related('images')
+    
     def get_queryset(self):
-        queryset = Event.objects.all()
+        queryset = self.base_queryset()
         
         # Filter by status
         status_filter = self.request.query_params.get('status', None)
@@ -39,26 +151,104 @@ class EventViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def conditional(self, queryset, build):
+        """Answer with 304 if the client's copy of ``queryset`` is current, else ``build()``"""
+        parts, last_modified = event_validators(queryset)
+        return conditional_response(
+            self.request, make_etag(self.request, *parts), last_modified, build
+        )
+    
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            self.filter_queryset(self.get_queryset()),
+            lambda: super(EventViewSet, self).list(request, *args, **kwargs),
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(
+            self.get_queryset().filter(slug=kwargs[self.lookup_field]),
+            lambda: super(EventViewSet, self).retrieve(request, *args, **kwargs),
+        )
+    
+    def paginated(self, queryset, pagination_class, serializer_class=None):
+        """Cursor-paginated response for an action with its own ordering"""
+        paginator = pagination_class()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer_class = serializer_class or self.get_serializer_class()
+        serializer = serializer_class(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+    
+    def list_events(self, events, pagination_class):
+        return self.conditional(
+            events,
+            lambda: self.paginated(self.sparse_queryset(events, pagination_class.ordering), pagination_class),
+        )
+    
     @action(detail=False, methods=['get'])
     def past(self, request):
-        """Get past events"""
-        events = Event.objects.filter(status='completed').order_by('-date')
-        serializer = self.get_serializer(events, many=True)
-        return Response(serializer.data)
+        """Get past events, latest first"""
+        events = self.base_queryset().filter(status='completed')
+        return self.list_events(events, PastEventPagination)
 
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
-        """Get upcoming events"""
-        events = Event.objects.filter(status='upcoming').order_by('date')
-        serializer = self.get_serializer(events, many=True)
-        return Response(serializer.data)
+        """Get upcoming events, soonest first"""
+        events = self.base_queryset().filter(status='upcoming')
+        return self.list_events(events, UpcomingEventPagination)
 
     @action(detail=False, methods=['get'])
     def current(self, request):
-        """Get current events"""
-        events = Event.objects.filter(status='ongoing').order_by('date')
-        serializer = self.get_serializer(events, many=True)
-        return Response(serializer.data)
+        """Get current events, soonest first"""
+        events = self.base_queryset().filter(status='ongoing')
+        return self.list_events(events, UpcomingEventPagination)
+    
+    @action(detail=False, methods=['get'])
+    def timeline(self, request):
+        """Upcoming, current and past events in one response, bucketed by their dates"""
+        entry = timeline.get_or_compute(request, self.build_timeline)
+        response = Response({**entry['data'], 'next_change': entry['next_change']})
+        patch_cache_control(response, **timeline.cache_control(entry['expires']))
+        patch_vary_headers(response, ['Accept'])
+        return response
+    
+    def build_timeline(self, now):
+        """``(buckets, next boundary)`` from one query over the non-cancelled events"""
+        events = self.sparse_queryset(
+            self.base_queryset().exclude(status='cancelled'), ('date', 'end_date', 'status', 'id')
+        )
+        events = list(events.annotate(timeline_status=timeline.derived_status(now)).order_by('date', 'id'))
+        buckets = {name: [] for name in timeline.BUCKETS.values()}
+        for event in events:
+            buckets[timeline.BUCKETS[event.timeline_status]].append(event)
+        # Past events latest first, like the past/ list
+        buckets['past'].reverse()
+        data = {}
+        for name, items in buckets.items():
+            data[name] = self.get_serializer(items, many=True).data
+            for event, row in zip(items, data[name]):
+                if 'status' in row:
+                    # The column lags until transition_event_status runs, possibly
+                    # after this payload is cached; send the status the bucket implies
+                    row['status'] = event.timeline_status
+        return data, timeline.next_boundary(events, now)
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Full-text search over events (?q=), best matches first with highlighted snippets"""
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        events = search.index.search(self.sparse_queryset(self.get_queryset()), text, limit=max(limit, 1))
+        results = self.get_serializer(events, many=True).data
+        for event, data in zip(events, results):
+            data['rank'] = event.search_rank
+            data['snippet'] = event.search_snippet
+        return Response({'query': text, 'count': len(results), 'results': results})
     
     @action(detail=True, methods=['post'])
     def add_image(self, request, slug=None):
@@ -84,9 +274,21 @@ class EventViewSet(viewsets.ModelViewSet):
     def registrations(self, request, slug=None):
         """Get all registrations for an event"""
         event = self.get_object()
-        registrations = EventRegistration.objects.filter(event=event)
-        serializer = EventRegistrationSerializer(registrations, many=True)
-        return Response(serializer.data)
+        registrations = EventRegistration.objects.filter(event=event).select_related('user', 'event')
+        return self.paginated(registrations, RegistrationPagination, EventRegistrationSerializer)
+    
+    @action(detail=True, methods=['get'], url_path='registrations/export')
+    def export_registrations(self, request, slug=None):
+        """Stream an event's registrations as CSV or NDJSON (?output=csv|ndjson)"""
+        event = self.get_object()
+        export_format = requested_format(request.query_params)
+        registrations = filter_registrations(
+            EventRegistration.objects.filter(event=event).select_related('user', 'event'),
+            request.query_params,
+        )
+        return export_response(
+            registrations, REGISTRATION_EXPORT_COLUMNS, export_format, f'{event.slug}-registrations'
+        )
 
 
 class EventRegistrationViewSet(viewsets.ModelViewSet):
@@ -94,71 +296,77 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
     queryset = EventRegistration.objects.all()
     serializer_class = EventRegistrationSerializer
     permission_classes = [AllowAny]
+    pagination_class = RegistrationPagination
     
     def get_queryset(self):
         queryset = EventRegistration.objects.select_related('user', 'event')
-        
-        # Filter by user
-        user_id = self.request.query_params.get('user', None)
-        if user_id:
-            queryset = queryset.filter(user_id=user_id)
-            
-        # Filter by event
-        event_slug = self.request.query_params.get('event', None)
-        if event_slug:
-            queryset = queryset.filter(event__slug=event_slug)
-            
+        return filter_registrations(queryset, self.request.query_params)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream registrations as CSV or NDJSON (?output=csv|ndjson), honouring the list filters"""
+        export_format = requested_format(request.query_params)
+        return export_response(
+            self.get_queryset(), REGISTRATION_EXPORT_COLUMNS, export_format, 'registrations'
+        )
+    
     def create(self, request, *args, **kwargs):
         # Allow creating user on the fly
-        data = request.data.copy()
+        data = request.data
         email = data.get('email')
         
         if not email:
             return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-        # Get or create user
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
         
-        user, created = User.objects.get_or_create(email=email, defaults={
-            'username': email,
-            'full_name': data.get('fullName', ''),
-            'phone': data.get('phone', ''),
-            'college': data.get('collegeName', ''),
-            'department': data.get('branchName', ''),
-            'year_of_study': data.get('yearOfStudy', ''),
-        })
+        # The requested event, else settings.ACTIVE_EVENT (which matches Route in App.tsx)
+        event = resolver.active_event(data.get('event_slug') or request.query_params.get('event_slug'))
         
-        # If user exists, update details if provided
-        if not created:
-             if 'fullName' in data: user.full_name = data['fullName']
-             if 'phone' in data: user.phone = data['phone']
-             if 'collegeName' in data: user.college = data['collegeName']
-             if 'branchName' in data: user.department = data['branchName']
-             if 'yearOfStudy' in data: user.year_of_study = data['yearOfStudy']
-             user.save()
-        
-        from .models import Event
-        # Try to find event by slug 'ai-verse-4' (which matches Route in App.tsx)
-        # or maybe the first upcoming event.
-        event = Event.objects.filter(slug='ai-verse-4').first()
         if not event:
-             event = Event.objects.filter(status='upcoming').first() # Fallback
-             
-        if not event:
-             return Response({'error': 'No active event found'}, status=status.HTTP_400_BAD_REQUEST)
-             
-        # Check if already registered
-        if EventRegistration.objects.filter(user=user, event=event).exists():
+            return Response({'error': 'No active event found'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        for attempt in range(2):
+            try:
+                # Rollup, counter and activity writes are merged and made once at the end
+                with transaction.atomic(), rollups.batch(), activity_log.batch():
+                    user, new_user = self.upsert_user(email, data)
+                    registration, created = register(user, event, new_user)
+                break
+            except EventFull:
+                return Response({'error': 'Event is full'}, status=status.HTTP_409_CONFLICT)
+            except IntegrityError:
+                # A concurrent request created the user or registration first;
+                # running again finds it
+                if attempt:
+                    raise
+        
+        if not created:
             # Return existing registration but success status needed for frontend flow
-             return Response({
-                 'message': 'Already registered', 
-                 'id': EventRegistration.objects.filter(user=user, event=event).first().id,
-                 'user_id': user.id, 
-                 'event_slug': event.slug
-             }, status=status.HTTP_200_OK)
-             
-        registration = EventRegistration.objects.create(user=user, event=event)
+            return Response({
+                'message': 'Already registered',
+                'id': registration.id,
+                'user_id': user.id,
+                'event_slug': event.slug
+            }, status=status.HTTP_200_OK)
         
         serializer = self.get_serializer(registration)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    def upsert_user(self, email, data):
+        """``(user, created)`` for the registering email, saving only the fields that changed"""
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        
+        fields = {
+            field: data[key] for key, field in REGISTRATION_USER_FIELDS.items() if key in data
+        }
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            defaults = {field: '' for field in REGISTRATION_USER_FIELDS.values()}
+            return User.objects.create(email=email, username=email, **{**defaults, **fields}), True
+        
+        changed = [field for field, value in fields.items() if getattr(user, field) != value]
+        if changed:
+            for field in changed:
+                setattr(user, field, fields[field])
+            user.save(update_fields=changed + ['updated_at'])
+        return user, False
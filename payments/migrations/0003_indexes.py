@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-submitted_at', '-id'], name='payment_status_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-submitted_at', '-id'], name='payment_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-submitted_at', '-id'], name='payment_pending_idx'),
+        ),
+    ]
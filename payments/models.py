@@ -1,11 +1,12 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from events.models import Event
+from aiverse_api.images import PreserveVariantsMixin
 
 User = get_user_model()
 
 
-class Payment(models.Model):
+class Payment(PreserveVariantsMixin, models.Model):
     """Payment model for event registrations"""
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -18,6 +19,7 @@ class Payment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     transaction_id = models.CharField(max_length=255, blank=True)
     payment_screenshot = models.ImageField(upload_to='payment_screenshots/', blank=True, null=True)
+    payment_screenshot_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies, maintained by aiverse_api.images")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
@@ -28,6 +30,16 @@ class Payment(models.Model):
         ordering = ['-submitted_at']
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
+        indexes = [
+            # Status-filtered and unfiltered lists, paged by (submitted_at, id)
+            models.Index(fields=['status', '-submitted_at', '-id'], name='payment_status_submitted_idx'),
+            models.Index(fields=['-submitted_at', '-id'], name='payment_submitted_idx'),
+            # The approval queue; a small partial index where the database supports it
+            models.Index(
+                fields=['-submitted_at', '-id'], condition=models.Q(status='pending'),
+                name='payment_pending_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.amount} - {self.status}"
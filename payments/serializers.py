@@ -1,23 +1,36 @@
 from rest_framework import serializers
+from aiverse_api.fieldsets import SparseFieldsetSerializerMixin
+from aiverse_api.images import SrcsetField
+from events.serializers import EventSummarySerializer
+from users.serializers import UserSummarySerializer
 from .models import Payment
 
 
-class PaymentSerializer(serializers.ModelSerializer):
-    """Serializer for payments"""
+class PaymentSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """Serializer for payments (supports ?fields=/?omit=/?expand=user,event,processed_by)"""
     user_email = serializers.EmailField(source='user.email', read_only=True)
     user_name = serializers.CharField(source='user.full_name', read_only=True)
     user_phone = serializers.CharField(source='user.phone', read_only=True)
     event_title = serializers.CharField(source='event.title', read_only=True)
     payment_screenshot_url = serializers.SerializerMethodField()
+    payment_screenshot_srcset = SrcsetField('payment_screenshot')
     processed_by_email = serializers.EmailField(source='processed_by.email', read_only=True)
     
     class Meta:
         model = Payment
         fields = ['id', 'user', 'user_email', 'user_name', 'user_phone', 'event', 
                   'event_title', 'amount', 'transaction_id', 'payment_screenshot',
-                  'payment_screenshot_url', 'status', 'notes', 'submitted_at', 
+                  'payment_screenshot_url', 'payment_screenshot_srcset', 'status', 'notes', 'submitted_at', 
                   'processed_at', 'processed_by', 'processed_by_email']
         read_only_fields = ['id', 'submitted_at', 'processed_at', 'processed_by']
+        field_dependencies = {
+            'payment_screenshot_url': ['payment_screenshot'],
+        }
+        expandable_fields = {
+            'user': (UserSummarySerializer, {}),
+            'event': (EventSummarySerializer, {}),
+            'processed_by': (UserSummarySerializer, {}),
+        }
     
     def get_payment_screenshot_url(self, obj):
         request = self.context.get('request')
@@ -1,32 +1,86 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
 from .models import Payment
 from events.models import EventRegistration
-from analytics.models import Activity
+from events import capacity, resolver
+from analytics.activity_log import log_activity
+from analytics import counters, rollups
+from aiverse_api import images
+
+images.register(Payment, 'payment_screenshot')
+
+
+# event_id/submitted_at pick the rollup bucket the old values are taken from
+STATE_FIELDS = ('status', 'amount', 'event_id', 'submitted_at')
+
+
+def _payment_state(instance):
+    # Read from __dict__ so deferred fields are never loaded just for this;
+    # None when any of them was deferred
+    if not all(name in instance.__dict__ for name in STATE_FIELDS):
+        return None
+    return tuple(instance.__dict__[name] for name in STATE_FIELDS)
+
+
+@receiver(post_init, sender=Payment)
+def remember_payment_state(sender, instance, **kwargs):
+    instance._saved_state = _payment_state(instance)
+
+
+@receiver(pre_save, sender=Payment)
+def load_deferred_payment_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Loaded with .only(): read the stored state before this save overwrites it
+    if raw or instance._state.adding or instance._saved_state is not None:
+        return
+    if update_fields is not None and update_fields.isdisjoint({*STATE_FIELDS, 'event'}):
+        return
+    instance._saved_state = Payment.objects.filter(pk=instance.pk).values_list(*STATE_FIELDS).first()
+
+
+@receiver(post_delete, sender=Payment)
+def payment_post_delete(sender, instance, **kwargs):
+    rollups.record_payment(instance, sign=-1)
+    counters.record_payment_deleted(instance)
+
 
 @receiver(post_save, sender=Payment)
 def payment_post_save(sender, instance, created, **kwargs):
+    if kwargs.get('raw'):
+        return
+    
+    # Keep the daily rollups and status counters in step with status/amount/event changes;
+    # a save that left deferred state unwritten has nothing to move
+    if created or instance._saved_state is not None:
+        rollups.record_payment(instance, previous=None if created else instance._saved_state)
+        counters.record_payment(instance, previous=instance._saved_state[:2], created=created)
+        instance._saved_state = _payment_state(instance)
+    
+    event = resolver.event_of(instance)
+    
     # 1. Log Activity on Creation
     if created:
-        Activity.objects.create(
+        log_activity(
             user=instance.user,
-            action=f"Initiated payment of {instance.amount} for {instance.event.title if instance.event else 'Event'}",
+            action=f"Initiated payment of {instance.amount} for {event.title if event else 'Event'}",
             activity_type='payment'
         )
     
     # 2. Handle Status Changes (Approval)
-    if instance.status == 'approved' and instance.event:
-        # Activate the registration
-        EventRegistration.objects.filter(
+    if instance.status == 'approved' and event:
+        # Activate the registration; a paid seat is honoured even past capacity
+        activated = EventRegistration.objects.filter(
             user=instance.user, 
-            event=instance.event
+            event_id=event.id,
+            is_active=False
         ).update(is_active=True)
+        if activated:
+            capacity.reserve_seat(instance.event_id, activated, enforce=False)
         
         # Log Approval Activity
         # Check if we haven't logged this recently to avoid duplicates if saved multiple times
         # For simplicity, we just log it.
-        Activity.objects.create(
+        log_activity(
             user=instance.user,
-            action=f"Payment approved for {instance.event.title}",
+            action=f"Payment approved for {event.title}",
             activity_type='payment'
         )
@@ -1,20 +1,46 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from .models import Payment
 from .serializers import PaymentSerializer
+from events import resolver
 from users.views import IsAdminUser
-from analytics.models import Activity
+from analytics.activity_log import log_activity
+from analytics.timeseries import filter_date_range
+from aiverse_api.exports import export_response, requested_format
+from aiverse_api.fieldsets import SparseFieldsetViewMixin
+from aiverse_api.pagination import PaymentPagination
 
 
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
-class PaymentViewSet(viewsets.ModelViewSet):
+PAYMENT_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('user_email', 'user.email'),
+    ('user_name', 'user.full_name'),
+    ('user_phone', 'user.phone'),
+    ('event', 'event.slug'),
+    ('event_title', 'event.title'),
+    ('amount', 'amount'),
+    ('transaction_id', 'transaction_id'),
+    ('status', 'status'),
+    ('notes', 'notes'),
+    ('submitted_at', 'submitted_at'),
+    ('processed_at', 'processed_at'),
+    ('processed_by', 'processed_by.email'),
+]
+
+
+class PaymentViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for payment management"""
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
+    pagination_class = PaymentPagination
     
     def get_permissions(self):
         if self.action in ['approve', 'reject', 'list', 'retrieve', 'update', 'partial_update', 'destroy', 'create']:
@@ -29,6 +55,17 @@ class PaymentViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
+        # Filter by event
+        event_slug = self.request.query_params.get('event', None)
+        if event_slug:
+            queryset = queryset.filter(event__slug=event_slug)
+        
+        # Filter by submission date (?from=&to=)
+        try:
+            queryset = filter_date_range(queryset, 'submitted_at', self.request.query_params)
+        except ValueError as exc:
+            raise ParseError(str(exc))
+        
         # Filter by user (for non-admin users)
         if hasattr(self.request.user, 'is_admin'):
             if not self.request.user.is_admin:
@@ -60,51 +97,66 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'User not found. Please register first.'}, status=status.HTTP_404_NOT_FOUND)
         
         # Resolve Event
-        from events.models import Event
-        event = Event.objects.filter(slug='ai-verse-4').first()
-        if not event:
-            event = Event.objects.filter(status='upcoming').first()
+        event = resolver.active_event(data.get('event_slug') or request.query_params.get('event_slug'))
             
-        # Prepare data for serializer
+        # Prepare data for serializer; the resolved event is attached on save
+        # so validation doesn't fetch it again
         data['user'] = user.id
         if event:
-            data['event'] = event.id
+            data.pop('event', None)
             
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer, user=user)
+        self.perform_create(serializer, user=user, event=event)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-    def perform_create(self, serializer, user=None):
+    def perform_create(self, serializer, user=None, event=None):
         if not user:
             user = self.request.user if self.request.user.is_authenticated else None
-            
-        serializer.save(user=user)
+        
+        extra = {'event': event.as_event()} if event else {}
+        serializer.save(user=user, **extra)
         
         # Create activity log
         if user:
-            Activity.objects.create(
+            log_activity(
                 user=user,
                 action='submitted a payment',
                 activity_type='payment'
             )
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream payments as CSV or NDJSON (?output=csv|ndjson), honouring the list filters"""
+        export_format = requested_format(request.query_params)
+        return export_response(self.get_queryset(), PAYMENT_EXPORT_COLUMNS, export_format, 'payments')
+    
+    def get_locked_object(self):
+        """Like get_object, but row-locks the payment for a status change"""
+        queryset = self.filter_queryset(self.get_queryset()).select_for_update(of=('self',))
+        payment = get_object_or_404(queryset, pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, payment)
+        return payment
+    
     @action(detail=True, methods=['post'], permission_classes=[AllowAny])
     def approve(self, request, pk=None):
         """Approve a payment"""
-        payment = self.get_object()
-        payment.status = 'approved'
-        payment.processed_at = timezone.now()
-        payment.processed_by = request.user if not request.user.is_anonymous else None
-        payment.save()
-        
-        # Create activity log
-        Activity.objects.create(
-            user=payment.user,
-            action=f'payment approved for {payment.event.title if payment.event else "registration"}',
-            activity_type='payment'
-        )
+        # Status counters are adjusted by the post_save signal inside this
+        # transaction, against the status read under the row lock
+        with transaction.atomic():
+            payment = self.get_locked_object()
+            payment.status = 'approved'
+            payment.processed_at = timezone.now()
+            payment.processed_by = request.user if not request.user.is_anonymous else None
+            payment.save()
+            
+            # Create activity log
+            log_activity(
+                user=payment.user,
+                action=f'payment approved for {payment.event.title if payment.event else "registration"}',
+                activity_type='payment'
+            )
         
         serializer = self.get_serializer(payment)
         return Response(serializer.data)
@@ -112,12 +164,13 @@ class PaymentViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[AllowAny])
     def reject(self, request, pk=None):
         """Reject a payment"""
-        payment = self.get_object()
-        payment.status = 'rejected'
-        payment.processed_at = timezone.now()
-        payment.processed_by = request.user if not request.user.is_anonymous else None
-        payment.notes = request.data.get('notes', payment.notes)
-        payment.save()
+        with transaction.atomic():
+            payment = self.get_locked_object()
+            payment.status = 'rejected'
+            payment.processed_at = timezone.now()
+            payment.processed_by = request.user if not request.user.is_anonymous else None
+            payment.notes = request.data.get('notes', payment.notes)
+            payment.save()
         
         serializer = self.get_serializer(payment)
         return Response(serializer.data)
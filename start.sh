@@ -6,4 +6,4 @@ echo "Running migrations..."
 python manage.py migrate --noinput
 
 echo "Starting gunicorn..."
-gunicorn aiverse_api.wsgi:application --bind 0.0.0.0:$PORT
+gunicorn aiverse_api.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT
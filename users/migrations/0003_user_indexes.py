@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_department_user_year_of_study'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-created_at', '-id'], name='user_created_idx'),
+        ),
+    ]
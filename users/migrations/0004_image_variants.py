@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies, maintained by aiverse_api.images'),
+        ),
+    ]
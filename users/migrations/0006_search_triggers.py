@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:10
+
+from django.db import migrations
+
+
+def install_triggers(apps, schema_editor):
+    from users.search import index
+    index.install_triggers(schema_editor)
+
+
+def uninstall_triggers(apps, schema_editor):
+    from users.search import index
+    index.uninstall_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_triggers, uninstall_triggers),
+    ]
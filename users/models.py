@@ -1,8 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from aiverse_api.images import PreserveVariantsMixin
 
 
-class User(AbstractUser):
+class User(PreserveVariantsMixin, AbstractUser):
     """Custom user model with additional fields"""
     email = models.EmailField(unique=True)
     full_name = models.CharField(max_length=255)
@@ -11,6 +12,7 @@ class User(AbstractUser):
     department = models.CharField(max_length=100, blank=True, null=True)
     year_of_study = models.CharField(max_length=50, blank=True, null=True)
     profile_image = models.ImageField(upload_to='profile_images/', blank=True, null=True)
+    profile_image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies, maintained by aiverse_api.images")
     is_admin = models.BooleanField(default=False, help_text='Admin dashboard access')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -22,6 +24,10 @@ class User(AbstractUser):
         ordering = ['-created_at']
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Date-range filters and the cursor-paginated admin list
+            models.Index(fields=['-created_at', '-id'], name='user_created_idx'),
+        ]
     
     def __str__(self):
         return self.email
@@ -0,0 +1,10 @@
+"""Name/contact index over users for the admin user search and autocomplete"""
+from django.contrib.auth import get_user_model
+from aiverse_api.search import TrigramSearchIndex
+
+User = get_user_model()
+
+index = TrigramSearchIndex(
+    User,
+    fields={'full_name': 'A', 'email': 'A', 'username': 'B', 'phone': 'B', 'college': 'C'},
+)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
+from aiverse_api.fieldsets import SparseFieldsetSerializerMixin
+from aiverse_api.images import SrcsetField
 
 User = get_user_model()
 
@@ -55,11 +57,12 @@ class UserLoginSerializer(serializers.Serializer):
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for user profile"""
     profile_image_url = serializers.SerializerMethodField()
+    profile_image_srcset = SrcsetField('profile_image')
     
     class Meta:
         model = User
         fields = ['id', 'email', 'username', 'full_name', 'phone', 'college', 'department', 'year_of_study',
-                  'profile_image', 'profile_image_url', 'is_admin', 'created_at', 'updated_at']
+                  'profile_image', 'profile_image_url', 'profile_image_srcset', 'is_admin', 'created_at', 'updated_at']
         read_only_fields = ['id', 'email', 'created_at', 'updated_at']
     
     def get_profile_image_url(self, obj):
@@ -70,9 +73,18 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return None
 
 
-class AdminUserSerializer(serializers.ModelSerializer):
-    """Serializer for admin user management"""
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Compact user for ?expand= on related objects"""
+    
+    class Meta:
+        model = User
+        fields = ['id', 'email', 'full_name', 'phone']
+
+
+class AdminUserSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """Serializer for admin user management (supports ?fields=/?omit=)"""
     profile_image_url = serializers.SerializerMethodField()
+    profile_image_srcset = SrcsetField('profile_image')
     total_payments = serializers.SerializerMethodField()
     total_registrations = serializers.SerializerMethodField()
     password = serializers.CharField(write_only=True, required=False) # Optional for updates, required for create logic can be handled
@@ -80,9 +92,15 @@ class AdminUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'email', 'username', 'full_name', 'phone', 'college', 'department', 'year_of_study',
-                  'profile_image_url', 'is_admin', 'is_active', 'created_at', 
+                  'profile_image_url', 'profile_image_srcset', 'is_admin', 'is_active', 'created_at', 
                   'total_payments', 'total_registrations', 'password']
         read_only_fields = ['id', 'created_at']
+        field_dependencies = {
+            'profile_image_url': ['profile_image'],
+            # Annotated by AdminUserViewSet
+            'total_payments': [],
+            'total_registrations': [],
+        }
     
     def get_profile_image_url(self, obj):
         if obj.profile_image:
@@ -92,10 +110,13 @@ class AdminUserSerializer(serializers.ModelSerializer):
         return None
     
     def get_total_payments(self, obj):
-        return obj.payment_set.count()
+        # Annotated by AdminUserViewSet; count directly for a lone instance
+        count = getattr(obj, 'payment_count', None)
+        return obj.payment_set.count() if count is None else count
     
     def get_total_registrations(self, obj):
-        return obj.eventregistration_set.count()
+        count = getattr(obj, 'registration_count', None)
+        return obj.eventregistration_set.count() if count is None else count
         
     def create(self, validated_data):
         password = validated_data.pop('password', 'password123') # Default password if not provided
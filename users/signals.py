@@ -0,0 +1,7 @@
+from django.contrib.auth import get_user_model
+from aiverse_api import images
+from . import search  # registers the index for rebuild_search_index
+
+User = get_user_model()
+
+images.register(User, 'profile_image')
@@ -1,10 +1,12 @@
 from rest_framework import status, viewsets, permissions
 from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Coalesce
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
@@ -12,10 +14,34 @@ from .serializers import (
     AdminUserSerializer,
     TokenSerializer
 )
-from analytics.models import Activity
+from analytics.activity_log import log_activity
+from analytics.timeseries import filter_date_range
+from aiverse_api.exports import export_response, requested_format
+from aiverse_api.fieldsets import SparseFieldsetViewMixin
+from aiverse_api.pagination import UserPagination
+from payments.models import Payment
+from events.models import EventRegistration
+from . import search
 
 User = get_user_model()
 
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 20
+
+USER_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('email', 'email'),
+    ('username', 'username'),
+    ('full_name', 'full_name'),
+    ('phone', 'phone'),
+    ('college', 'college'),
+    ('department', 'department'),
+    ('year_of_study', 'year_of_study'),
+    ('is_admin', 'is_admin'),
+    ('is_active', 'is_active'),
+    ('created_at', 'created_at'),
+]
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -26,7 +52,7 @@ def register(request):
         user = serializer.save()
         
         # Create activity log
-        Activity.objects.create(
+        log_activity(
             user=user,
             action='registered',
             activity_type='registration'
@@ -53,7 +79,7 @@ def login(request):
         user = serializer.validated_data['user']
         
         # Create activity log
-        Activity.objects.create(
+        log_activity(
             user=user,
             action='logged in',
             activity_type='login'
@@ -89,32 +115,81 @@ def profile(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def with_activity_counts(queryset, payments=True, registrations=True):
+    """Annotate ``payment_count``/``registration_count`` for AdminUserSerializer in the same query"""
+    def count(model):
+        rows = model.objects.filter(user=models.OuterRef('pk')).order_by().values('user')
+        return Coalesce(
+            models.Subquery(rows.annotate(n=models.Count('id')).values('n'), output_field=models.IntegerField()),
+            0,
+        )
+    if payments:
+        queryset = queryset.annotate(payment_count=count(Payment))
+    if registrations:
+        queryset = queryset.annotate(registration_count=count(EventRegistration))
+    return queryset
+
+
 class IsAdminUser(permissions.BasePermission):
     """Custom permission to only allow admin users"""
     def has_permission(self, request, view):
         return request.user and request.user.is_authenticated and request.user.is_admin
 
 
-class AdminUserViewSet(viewsets.ModelViewSet):
+class AdminUserViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for admin user management"""
     queryset = User.objects.all()
     serializer_class = AdminUserSerializer
     permission_classes = [AllowAny]
+    pagination_class = UserPagination
     
     def get_queryset(self):
+        # Only pay for the counts the (possibly ?fields=-trimmed) serializer shows
+        fields = self.get_serializer().fields
+        return with_activity_counts(
+            self.filtered_users(),
+            payments='total_payments' in fields,
+            registrations='total_registrations' in fields,
+        )
+    
+    def filtered_users(self):
+        """Users matching the list filters, without the serializer's counts"""
         queryset = User.objects.all()
         
-        # Filter by search query
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                models.Q(email__icontains=search) |
-                models.Q(username__icontains=search) |
-                models.Q(full_name__icontains=search)
-            )
+        # Filter by search query (word-prefix match through the search index)
+        text = self.request.query_params.get('search', None)
+        if text:
+            queryset = search.index.filter(queryset, text)
+        
+        # Filter by sign-up date (?from=&to=)
+        try:
+            queryset = filter_date_range(queryset, 'created_at', self.request.query_params)
+        except ValueError as exc:
+            raise ParseError(str(exc))
         
         return queryset.order_by('-created_at')
     
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Best matches for a partly typed name, email, phone or college (?q=), id/name/email only"""
+        text = request.query_params.get('q', '').strip()
+        try:
+            limit = min(int(request.query_params.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT)), AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        users = search.index.search(User.objects.only('id', 'full_name', 'email'), text, limit=max(limit, 1))
+        return Response({
+            'query': text,
+            'results': [{'id': user.id, 'full_name': user.full_name, 'email': user.email} for user in users],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream users as CSV or NDJSON (?output=csv|ndjson), honouring the list filters"""
+        export_format = requested_format(request.query_params)
+        return export_response(self.filtered_users(), USER_EXPORT_COLUMNS, export_format, 'users')
+    
     @action(detail=True, methods=['post'])
     def toggle_admin(self, request, pk=None):
         """Toggle admin status for a user"""